@@ -1,10 +1,21 @@
 #!/usr/bin/env python3
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, date
 import json
 import os
+import gzip
+import math
+import argparse
+import asyncio
+import hashlib
+import heapq
+import calendar
+from itertools import groupby
+from operator import itemgetter
+from urllib.parse import urlsplit, parse_qs
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import pandas as pd
@@ -12,24 +23,1628 @@ from datetime import datetime, date, timedelta
 import numpy as np
 
 
-class WorkoutTracker:
+class HistoryIndex:
+    """Column arrays with maintained sort orders for filtering and sorting the history"""
+
+    COLUMNS = ("Date", "Activity", "Distance", "Elevation")
+
+    def __init__(self, workouts=()):
+        self.rebuild(workouts)
+
+    def rebuild(self, workouts):
+        workouts = list(workouts)
+        self.dates = np.array([w['date'] for w in workouts], dtype='datetime64[D]')
+        self.distance = np.array([w['distance'] for w in workouts], dtype=float)
+        self.elevation = np.array([w['elevation'] for w in workouts], dtype=float)
+
+        # Per-activity position lists (ascending positions into the workout list)
+        self.positions = {}
+        for i, w in enumerate(workouts):
+            self.positions.setdefault(w['activity'], []).append(i)
+        self.positions = {a: np.array(p, dtype=np.intp) for a, p in self.positions.items()}
+
+        # Stable ascending sort order and sorted values for each numeric column
+        self.orders = {}
+        self.sorted_values = {}
+        for col in ("Date", "Distance", "Elevation"):
+            values = self._values(col)
+            order = np.argsort(values, kind='stable')
+            self.orders[col] = order
+            self.sorted_values[col] = values[order]
+        self._activity_order = None
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _values(self, col):
+        return {"Date": self.dates, "Distance": self.distance, "Elevation": self.elevation}[col]
+
+    def add(self, workout):
+        self.extend([workout])
+
+    def extend(self, workouts):
+        """Append workouts, inserting them into every sort order without re-sorting"""
+        if not workouts:
+            return
+        first = len(self.dates)
+        self.dates = np.concatenate((self.dates, np.array([w['date'] for w in workouts], dtype='datetime64[D]')))
+        self.distance = np.concatenate((self.distance, np.array([w['distance'] for w in workouts], dtype=float)))
+        self.elevation = np.concatenate((self.elevation, np.array([w['elevation'] for w in workouts], dtype=float)))
+
+        for col in ("Date", "Distance", "Elevation"):
+            new_values = self._values(col)[first:]
+            new_order = np.argsort(new_values, kind='stable')
+            sorted_values = self.sorted_values[col]
+            slots = np.searchsorted(sorted_values, new_values[new_order], side='right')
+            self.orders[col] = np.insert(self.orders[col], slots, first + new_order)
+            self.sorted_values[col] = np.insert(sorted_values, slots, new_values[new_order])
+
+        for i, w in enumerate(workouts, start=first):
+            activity_positions = self.positions.get(w['activity'], np.empty(0, dtype=np.intp))
+            self.positions[w['activity']] = np.append(activity_positions, i)
+        self._activity_order = None
+
+    def insert(self, positions, workouts):
+        """Insert workouts so they land at the given ascending list positions, shifting later positions up"""
+        if not workouts:
+            return
+        positions = np.asarray(positions, dtype=np.intp)
+        if positions[0] == len(self.dates):
+            self.extend(workouts)  # all at the end
+            return
+        n = len(self.dates) + len(workouts)
+        inserted = np.zeros(n, dtype=bool)
+        inserted[positions] = True
+        moved = np.flatnonzero(~inserted)  # new position of each existing workout
+
+        new_columns = {
+            "Date": np.array([w['date'] for w in workouts], dtype='datetime64[D]'),
+            "Distance": np.array([w['distance'] for w in workouts], dtype=float),
+            "Elevation": np.array([w['elevation'] for w in workouts], dtype=float)
+        }
+        for col, new_values in new_columns.items():
+            values = np.empty(n, dtype=new_values.dtype)
+            values[moved] = self._values(col)
+            values[positions] = new_values
+            if col == "Date":
+                self.dates = values
+            elif col == "Distance":
+                self.distance = values
+            else:
+                self.elevation = values
+
+            # Ties stay in list order, as in a stable sort: within a run of equal values
+            # the slot is found by position, on a (run, position) key
+            order = moved[self.orders[col]]
+            sorted_values = self.sorted_values[col]
+            new_order = np.lexsort((positions, new_values))
+            new_sorted = new_values[new_order]
+            new_positions = positions[new_order]
+            slots = np.searchsorted(sorted_values, new_sorted, side='left')
+            ties = np.searchsorted(sorted_values, new_sorted, side='right') > slots
+            if ties.any():
+                runs = np.concatenate(([0], np.cumsum(sorted_values[1:] != sorted_values[:-1]))).astype(np.int64)
+                slots[ties] = np.searchsorted(runs * n + order, runs[slots[ties]] * n + new_positions[ties])
+            self.orders[col] = np.insert(order, slots, new_positions)
+            self.sorted_values[col] = np.insert(sorted_values, slots, new_sorted)
+
+        for activity in self.positions:
+            self.positions[activity] = moved[self.positions[activity]]
+        added = {}
+        for position, w in zip(positions, workouts):
+            added.setdefault(w['activity'], []).append(position)
+        for activity, new_positions in added.items():
+            activity_positions = self.positions.get(activity, np.empty(0, dtype=np.intp))
+            self.positions[activity] = np.sort(np.concatenate((activity_positions, new_positions)))
+        self._activity_order = None
+
+    def remove(self, positions):
+        """Remove workouts at list positions, shifting later positions down to close the gaps"""
+        removed = np.zeros(len(self.dates), dtype=bool)
+        removed[np.asarray(positions, dtype=np.intp)] = True
+        shift = np.cumsum(removed)  # positions removed at or before each position
+        
+        keep = ~removed
+        self.dates = self.dates[keep]
+        self.distance = self.distance[keep]
+        self.elevation = self.elevation[keep]
+
+        for col in ("Date", "Distance", "Elevation"):
+            order = self.orders[col]
+            kept = keep[order]
+            order = order[kept]
+            self.orders[col] = order - shift[order]
+            self.sorted_values[col] = self.sorted_values[col][kept]
+
+        for activity, activity_positions in list(self.positions.items()):
+            activity_positions = activity_positions[keep[activity_positions]]
+            if len(activity_positions):
+                self.positions[activity] = activity_positions - shift[activity_positions]
+            else:
+                del self.positions[activity]
+        self._activity_order = None
+
+    def order(self, col):
+        """Stable ascending order of list positions for a column"""
+        if col == "Activity":
+            # Concatenating the position lists in name order is a stable sort by activity
+            if self._activity_order is None:
+                parts = [self.positions[a] for a in sorted(self.positions)]
+                self._activity_order = np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+            return self._activity_order
+        return self.orders[col]
+
+    def _range_mask(self, col, low, high):
+        sorted_values = self.sorted_values[col]
+        start = np.searchsorted(sorted_values, low, side='left') if low is not None else 0
+        stop = np.searchsorted(sorted_values, high, side='right') if high is not None else len(sorted_values)
+        mask = np.zeros(len(self.dates), dtype=bool)
+        mask[self.orders[col][start:stop]] = True
+        return mask
+
+    def _date_slice(self, start_date, end_date):
+        # Positions of workouts dated within [start_date, end_date], in date order
+        sorted_dates = self.sorted_values["Date"]
+        low = np.searchsorted(sorted_dates, np.datetime64(start_date, 'D'), side='left')
+        high = np.searchsorted(sorted_dates, np.datetime64(end_date, 'D'), side='right')
+        return self.orders["Date"][low:high]
+
+    def window_total(self, col, start_date, end_date):
+        """Sum of a column over workouts dated within [start_date, end_date]"""
+        return self._values(col)[self._date_slice(start_date, end_date)].sum()
+
+    def binned_elevation(self, start_date, end_date, bin_of):
+        """Elevation summed per bin over [start_date, end_date]; bin_of maps dates to integer bins
+
+        Returns (first bin, totals) with empty bins between the first and last
+        workout's bin filled with zeros, like a pandas resample.
+        """
+        positions = self._date_slice(start_date, end_date)
+        if not len(positions):
+            return None, np.empty(0)
+        bins = bin_of(self.dates[positions])
+        first = bins.min()
+        totals = np.bincount(bins - first, weights=self.elevation[positions], minlength=int(bins.max() - first) + 1)
+        return first, totals
+
+    def query(self, sort_column="Date", descending=True, start_date=None, end_date=None,
+              activity=None, min_distance=None, max_distance=None,
+              min_elevation=None, max_elevation=None):
+        """Return list positions matching the filters, in the requested column order"""
+        mask = np.ones(len(self.dates), dtype=bool)
+
+        if start_date is not None or end_date is not None:
+            low = np.datetime64(start_date, 'D') if start_date is not None else None
+            high = np.datetime64(end_date, 'D') if end_date is not None else None
+            mask &= self._range_mask("Date", low, high)
+        if min_distance is not None or max_distance is not None:
+            mask &= self._range_mask("Distance", min_distance, max_distance)
+        if min_elevation is not None or max_elevation is not None:
+            mask &= self._range_mask("Elevation", min_elevation, max_elevation)
+        if activity is not None:
+            activity_mask = np.zeros(len(self.dates), dtype=bool)
+            activity_mask[self.positions.get(activity, np.empty(0, dtype=np.intp))] = True
+            mask &= activity_mask
+
+        order = self.order(sort_column)
+        result = order[mask[order]]
+        return result[::-1] if descending else result
+
+
+class CalendarHeatmap:
+    """Daily elevation over the challenge window, kept as a precomputed weeks x weekdays grid"""
+
+    WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+    def __init__(self, start, end, workouts=()):
+        self.start = start
+        self.end = end
+        
+        # Grid rows are weeks starting on the Monday on/before the challenge start,
+        # so a day's flat index in the grid is simply its offset from that Monday
+        self.origin = start - timedelta(days=start.weekday())
+        n_weeks = (end - self.origin).days // 7 + 1
+        self.grid = np.zeros((n_weeks, 7))
+        
+        # Cells before the start or after the end of the challenge are left blank
+        offsets = np.arange(n_weeks * 7)
+        self.outside = ((offsets < (start - self.origin).days) |
+                        (offsets > (end - self.origin).days)).reshape(n_weeks, 7)
+        
+        self.fig = None
+        self.image = None
+        self.rebuild(workouts)
+
+    def rebuild(self, workouts):
+        self.grid[:] = 0
+        self.update(workouts)
+
+    def update(self, workouts, sign=1):
+        """Add (or with sign=-1, remove) workouts' elevation and update the image in place"""
+        if workouts:
+            dates = np.array([w['date'] for w in workouts], dtype='datetime64[D]')
+            elevation = sign * np.array([w['elevation'] for w in workouts], dtype=float)
+            offsets = (dates - np.datetime64(self.origin, 'D')).astype(int)
+            inside = (dates >= np.datetime64(self.start, 'D')) & (dates <= np.datetime64(self.end, 'D'))
+            np.add.at(self.grid.reshape(-1), offsets[inside], elevation[inside])
+        self._refresh_image()
+
+    def _display_data(self):
+        # Weekdays down the side, weeks across, like a wall calendar
+        return np.ma.masked_array(self.grid.T, mask=self.outside.T)
+
+    def _refresh_image(self):
+        if self.image is not None:
+            self.image.set_data(self._display_data())
+            self.image.set_clim(0, max(1, self.grid.max()))
+
+    def _build_figure(self):
+        self.fig = Figure(figsize=(8, 3), dpi=100)
+        ax = self.fig.add_subplot(111)
+        
+        cmap = plt.get_cmap('Greens').copy()
+        cmap.set_bad('#f0f0f0')
+        self.image = ax.imshow(self._display_data(), cmap=cmap, aspect='auto',
+                               interpolation='nearest', vmin=0, vmax=max(1, self.grid.max()))
+        
+        # Label the first week of each month along the top
+        month_ticks = []
+        month_labels = []
+        month = self.start.replace(day=1)
+        while month <= self.end:
+            first_day = max(month, self.start)
+            month_ticks.append((first_day - self.origin).days // 7)
+            month_labels.append(month.strftime('%b'))
+            month = (month + timedelta(days=32)).replace(day=1)
+        ax.set_xticks(month_ticks)
+        ax.set_xticklabels(month_labels, fontsize=8)
+        ax.xaxis.tick_top()
+        ax.set_yticks(range(7))
+        ax.set_yticklabels(self.WEEKDAYS, fontsize=8)
+        ax.tick_params(length=0)
+        
+        colorbar = self.fig.colorbar(self.image, ax=ax, pad=0.02)
+        colorbar.set_label('Elevation Gain (m)')
+        
+        self.fig.tight_layout()
+
+    def render(self, parent_frame):
+        # The figure is built once and re-attached, so redraws only repaint the raster
+        if self.fig is None:
+            self._build_figure()
+        canvas = FigureCanvasTkAgg(self.fig, master=parent_frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill='both', expand=True)
+
+
+def ewma(values, alpha, initial=0.0, block=64):
+    """Exponentially weighted average y[t] = (1 - alpha) * y[t-1] + alpha * x[t], vectorized in blocks"""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n == 0:
+        return np.empty(0)
+    decay = 1.0 - alpha
+    
+    # Within a block the recursion unrolls to a scaled cumulative sum; blocks are kept
+    # short so decay ** -j stays well inside float range
+    n_blocks = -(-n // block)
+    padded = np.zeros(n_blocks * block)
+    padded[:n] = values
+    padded = padded.reshape(n_blocks, block)
+    steps = np.arange(block)
+    partial = alpha * decay ** steps * np.cumsum(padded * decay ** -steps, axis=1)
+    
+    # Carry each block's final value into the next one
+    carry = np.empty(n_blocks)
+    previous = initial
+    block_decay = decay ** block
+    for i in range(n_blocks):
+        carry[i] = previous
+        previous = block_decay * previous + partial[i, -1]
+    
+    result = partial + decay ** (steps + 1) * carry[:, None]
+    return result.reshape(-1)[:n]
+
+
+class TrainingMetrics:
+    """Rolling volume and acute/chronic load computed over the daily elevation and distance series"""
+
+    WINDOWS = (7, 28)
+    ACUTE_DAYS = 7
+    CHRONIC_DAYS = 42
+
+    def __init__(self, workouts=(), today=None):
+        self.acute_alpha = 1 - np.exp(-1 / self.ACUTE_DAYS)
+        self.chronic_alpha = 1 - np.exp(-1 / self.CHRONIC_DAYS)
+        self.rebuild(workouts, today)
+
+    def rebuild(self, workouts, today=None):
+        workouts = list(workouts)
+        today = np.datetime64(today or date.today(), 'D')
+        
+        if not workouts:
+            self.start = None
+            self.elevation = np.empty(0)
+            self.distance = np.empty(0)
+        else:
+            dates = np.array([w['date'] for w in workouts], dtype='datetime64[D]')
+            self.start = dates.min()
+            n_days = int((max(dates.max(), today) - self.start).astype(int)) + 1
+            offsets = (dates - self.start).astype(int)
+            self.elevation = np.bincount(offsets, weights=[w['elevation'] for w in workouts], minlength=n_days)
+            self.distance = np.bincount(offsets, weights=[w['distance'] for w in workouts], minlength=n_days)
+        
+        self.rolling_elevation = {w: self._rolling(self.elevation, w) for w in self.WINDOWS}
+        self.rolling_distance = {w: self._rolling(self.distance, w) for w in self.WINDOWS}
+        self.acute = ewma(self.elevation, self.acute_alpha)
+        self.chronic = ewma(self.elevation, self.chronic_alpha)
+
+    @staticmethod
+    def _rolling(values, window):
+        # Trailing window sums as differences of one cumulative sum
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        lagged = np.concatenate((np.zeros(window), cumulative[:-window]))[:len(cumulative)]
+        return (cumulative - lagged)[1:]
+
+    def _extend(self, n_days):
+        # Grow the series with rest days; only the new tail is computed
+        extra = n_days - len(self.elevation)
+        if extra <= 0:
+            return
+        self.elevation = np.concatenate((self.elevation, np.zeros(extra)))
+        self.distance = np.concatenate((self.distance, np.zeros(extra)))
+        for window in self.WINDOWS:
+            for values, rolling in ((self.elevation, self.rolling_elevation), (self.distance, self.rolling_distance)):
+                tail = self._rolling(values[-(extra + window):], window)[-extra:]
+                rolling[window] = np.concatenate((rolling[window], tail))
+        steps = np.arange(1, extra + 1)
+        self.acute = np.concatenate((self.acute, self.acute[-1] * (1 - self.acute_alpha) ** steps))
+        self.chronic = np.concatenate((self.chronic, self.chronic[-1] * (1 - self.chronic_alpha) ** steps))
+
+    def covers(self, workout_date):
+        """Whether a date can be folded in incrementally (on or after the series start)"""
+        return self.start is not None and np.datetime64(workout_date, 'D') >= self.start
+
+    def add(self, workout, sign=1):
+        """Fold one workout into the series in place; sign=-1 removes it"""
+        day = np.datetime64(workout['date'], 'D')
+        offset = int((day - self.start).astype(int))
+        self._extend(offset + 1)
+        
+        elevation = sign * workout['elevation']
+        distance = sign * workout['distance']
+        
+        # Every metric is linear in the daily values, so a change on one day is a
+        # fixed-shape update from that day onwards
+        self.elevation[offset] += elevation
+        self.distance[offset] += distance
+        for window in self.WINDOWS:
+            self.rolling_elevation[window][offset:offset + window] += elevation
+            self.rolling_distance[window][offset:offset + window] += distance
+        steps = np.arange(len(self.elevation) - offset)
+        self.acute[offset:] += self.acute_alpha * elevation * (1 - self.acute_alpha) ** steps
+        self.chronic[offset:] += self.chronic_alpha * elevation * (1 - self.chronic_alpha) ** steps
+
+    def current(self, today=None):
+        """Metric values as of today (rest days since the last workout included)"""
+        if self.start is None:
+            return None
+        offset = int((np.datetime64(today or date.today(), 'D') - self.start).astype(int))
+        if offset < 0:
+            return None
+        self._extend(offset + 1)
+        return {
+            'elevation_7': self.rolling_elevation[7][offset],
+            'elevation_28': self.rolling_elevation[28][offset],
+            'distance_7': self.rolling_distance[7][offset],
+            'distance_28': self.rolling_distance[28][offset],
+            'acute_load': self.acute[offset],
+            'chronic_load': self.chronic[offset]
+        }
+
+    def recent(self, days=90):
+        """Date labels and metric series for the last N days of the series"""
+        if self.start is None:
+            return {'dates': []}
+        window = slice(max(0, len(self.elevation) - days), len(self.elevation))
+        dates = self.start + np.arange(window.start, window.stop)
+        return {
+            'dates': [d.astype(datetime).strftime('%b %d') for d in dates],
+            'elevation_7': self.rolling_elevation[7][window],
+            'elevation_28': self.rolling_elevation[28][window],
+            'acute_load': self.acute[window],
+            'chronic_load': self.chronic[window]
+        }
+
+
+class GoalForecast:
+    """Monte Carlo forecast of the challenge total, bootstrapped per activity from historical blocks of days"""
+
+    N_SIMULATIONS = 100000
+    BLOCK_DAYS = 7
+    MIN_POOL = 14  # fewer seasonal blocks than this falls back to the whole history
+    POOL_DRAWS = 4096  # combined block totals drawn for each pool when there are several activities
+    QUANTILES = (0.1, 0.5, 0.9)
+
+    def __init__(self, n_simulations=N_SIMULATIONS, seed=0):
+        self.n_simulations = n_simulations
+        self.seed = seed
+
+    @staticmethod
+    def _daily_series(workouts, today):
+        # Daily elevation per activity (one row each) from the first workout through today, rest days included
+        dates = np.array([w['date'] for w in workouts], dtype='datetime64[D]')
+        elevation = np.array([w['elevation'] for w in workouts], dtype=float)
+        today = np.datetime64(today, 'D')
+        past = dates <= today
+        if not past.any():
+            return None, None
+        first = dates[past].min()
+        offsets = (dates[past] - first).astype(int)
+        n_days = int((today - first).astype(int)) + 1
+        
+        # Archived days summarized before per-activity series existed have no activity; they get a row of their own
+        codes = {}
+        rows = np.array([codes.setdefault(w.get('activity'), len(codes)) for w, p in zip(workouts, past) if p], dtype=np.int64)
+        daily = np.bincount(rows * n_days + offsets, weights=elevation[past], minlength=len(codes) * n_days)
+        return daily.reshape(len(codes), n_days), first
+
+    def _pool(self, daily, first, length, month, rng):
+        """Simulated elevation totals of `length` days starting near `month`
+
+        Each activity's total comes from that activity's own historical blocks starting
+        within a month either side, drawn independently of the other activities, so
+        every activity keeps its own season (a winter's ski touring can combine with
+        another winter's running).
+        """
+        cumulative = np.concatenate((np.zeros((len(daily), 1)), np.cumsum(daily, axis=1)), axis=1)
+        sums = cumulative[:, length:] - cumulative[:, :-length]
+        
+        start_months = (first + np.arange(sums.shape[1])).astype('datetime64[M]').astype(int) % 12 + 1
+        distance = np.abs(start_months - month)
+        seasonal = sums[:, np.minimum(distance, 12 - distance) <= 1]
+        blocks = seasonal if seasonal.shape[1] >= self.MIN_POOL else sums
+        if len(blocks) == 1:
+            return blocks[0]
+        picks = rng.integers(0, blocks.shape[1], size=(len(blocks), self.POOL_DRAWS))
+        return np.take_along_axis(blocks, picks, axis=1).sum(axis=0)
+
+    def run(self, workouts, start_date, end_date, goal, current, today=None):
+        """Simulate the rest of the challenge; returns completion probability and a quantile fan
+
+        With no days left to simulate the outcome is known: the fan is the current total
+        alone, and 'final' is set once the challenge is over.
+        """
+        today = today or date.today()
+        sim_start = max(today + timedelta(days=1), start_date)
+        n_days = (end_date - sim_start).days + 1
+        if n_days <= 0:
+            total = np.array([float(current)])
+            return {
+                'probability': 1.0 if current >= goal else 0.0,
+                'final': today > end_date,
+                'dates': [end_date],
+                'p10': total,
+                'p50': total,
+                'p90': total
+            }
+        if not workouts:
+            return None
+        daily, first = self._daily_series(workouts, today)
+        if daily is None or daily.shape[1] < self.BLOCK_DAYS:
+            return None
+        
+        # Remaining season as whole weeks plus a shorter final block
+        n_blocks = -(-n_days // self.BLOCK_DAYS)
+        lengths = [self.BLOCK_DAYS] * (n_blocks - 1) + [n_days - self.BLOCK_DAYS * (n_blocks - 1)]
+        block_starts = [sim_start + timedelta(days=self.BLOCK_DAYS * k) for k in range(n_blocks)]
+        
+        # One flat pool array; each simulated block draws from its own slice
+        rng = np.random.default_rng(self.seed)
+        pools = {}
+        for length, block_start in zip(lengths, block_starts):
+            key = (length, block_start.month)
+            if key not in pools:
+                pools[key] = self._pool(daily, first, length, block_start.month, rng)
+        keys = list(pools)
+        pool_values = np.concatenate([pools[k] for k in keys]).astype(np.float32)
+        pool_offsets = np.cumsum([0] + [len(pools[k]) for k in keys[:-1]])
+        slot = {k: i for i, k in enumerate(keys)}
+        block_slots = [slot[(length, block_start.month)] for length, block_start in zip(lengths, block_starts)]
+        offsets = pool_offsets[block_slots].astype(np.int32)[:, None]
+        counts = np.array([len(pools[keys[i]]) for i in block_slots], dtype=np.float32)[:, None]
+        
+        # All trajectories at once, laid out blocks x simulations
+        draws = rng.random((n_blocks, self.n_simulations), dtype=np.float32)
+        draws *= counts
+        indices = draws.astype(np.int32)
+        indices += offsets
+        trajectories = pool_values[indices]
+        for k in range(1, n_blocks):
+            trajectories[k] += trajectories[k - 1]
+        
+        remaining = goal - current
+        probability = np.count_nonzero(trajectories[-1] >= remaining) / self.n_simulations
+        
+        # Quantiles by selection rather than a full sort, in place: the median first,
+        # then the lower quantile within the lower half and the upper within the upper half
+        low, middle, high = [int(round(q * (self.n_simulations - 1))) for q in self.QUANTILES]
+        trajectories.partition(middle, axis=1)
+        trajectories[:, :middle].partition(low, axis=1)
+        trajectories[:, middle + 1:].partition(high - middle - 1, axis=1)
+        fan = current + trajectories[:, [low, middle, high]].T.astype(float)
+        
+        block_ends = [block_start + timedelta(days=length - 1) for block_start, length in zip(block_starts, lengths)]
+        return {
+            'probability': probability,
+            'final': False,
+            'dates': block_ends,
+            'p10': fan[0],
+            'p50': fan[1],
+            'p90': fan[2]
+        }
+
+
+class WorkoutStore:
+    """Hot history file for the last year plus compressed, per-year archive segments"""
+
+    def __init__(self, filename, archive_dir=None):
+        self.filename = filename
+        self.archive_dir = archive_dir or os.path.splitext(filename)[0] + "_archive"
+        self.manifest_filename = os.path.join(self.archive_dir, "index.json")
+        self._manifest = {}
+        self._manifest_signature = None
+        self._segments = {}  # year -> records, filled on first use
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def signature(self):
+        # Changes whenever the hot file or the archive is rewritten, by us or by another process
+        return (self._stat(self.filename), self._stat(self.manifest_filename))
+
+    def load(self):
+        if not os.path.exists(self.filename):
+            return []
+        with open(self.filename, 'r') as f:
+            return json.load(f)
+
+    def save(self, workouts):
+        # Write a temporary file and swap it in so readers never see a partial file
+        temp_filename = self.filename + ".tmp"
+        with open(temp_filename, 'w') as f:
+            json.dump(workouts, f, indent=2, allow_nan=False)
+        os.replace(temp_filename, self.filename)
+
+    def manifest(self):
+        """Aggregates for each archived year; the segment files themselves are only read on demand"""
+        signature = self._stat(self.manifest_filename)
+        if signature != self._manifest_signature:
+            self._manifest = {}
+            if signature is not None:
+                with open(self.manifest_filename, 'r') as f:
+                    self._manifest = json.load(f)
+            self._manifest_signature = signature
+            self._segments = {}
+        return self._manifest
+
+    @staticmethod
+    def _read_records(path):
+        with gzip.open(path, 'rt') as f:
+            return [json.loads(line) for line in f]
+
+    @staticmethod
+    def _write_records(path, records):
+        with gzip.open(path + ".tmp", 'wt') as f:
+            for w in records:
+                f.write(json.dumps(w) + "\n")
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def _new_records(existing, records):
+        """The records not already in `existing`, counted per content so genuine same-day duplicates still add up"""
+        counts = {}
+        for w in existing:
+            key = content_key(w)
+            counts[key] = counts.get(key, 0) + 1
+        new_records = []
+        for w in records:
+            key = content_key(w)
+            if counts.get(key):
+                counts[key] -= 1
+            else:
+                new_records.append(w)
+        return new_records
+
+    def load_segment(self, year):
+        year = str(year)
+        if year not in self._segments:
+            self._segments[year] = self._read_records(os.path.join(self.archive_dir, self.manifest()[year]['file']))
+        return self._segments[year]
+
+    def load_segments(self, since=None):
+        """Archived workouts, oldest first, from every segment that reaches `since` (YYYY-MM-DD)"""
+        workouts = []
+        for year, segment in sorted(self.manifest().items()):
+            if since is None or segment['last_date'] >= since:
+                workouts.extend(self.load_segment(year))
+        return workouts
+
+    @staticmethod
+    def _summarize(year, records, file):
+        # Totals, per-activity totals and the daily series, so most views never open the segment
+        start = np.datetime64(f"{year}-01-01", 'D')
+        n_days = int((np.datetime64(f"{int(year) + 1}-01-01", 'D') - start).astype(int))
+        offsets = (np.array([w['date'] for w in records], dtype='datetime64[D]') - start).astype(int)
+        elevations = np.array([w['elevation'] for w in records], dtype=float)
+        distances = np.array([w['distance'] for w in records], dtype=float)
+        daily_elevation = np.bincount(offsets, weights=elevations, minlength=n_days)
+        daily_distance = np.bincount(offsets, weights=distances, minlength=n_days)
+        
+        activities = {}
+        for w in records:
+            totals = activities.setdefault(w['activity'], {'count': 0, 'distance': 0.0, 'elevation': 0.0})
+            totals['count'] += 1
+            totals['distance'] += w['distance']
+            totals['elevation'] += w['elevation']
+        
+        # The same series per activity, for the goal forecast
+        names = np.array([w['activity'] for w in records], dtype=object)
+        elevation_by_activity, distance_by_activity = {}, {}
+        for activity in activities:
+            mine = names == activity
+            elevation = np.bincount(offsets[mine], weights=elevations[mine], minlength=n_days)
+            distance = np.bincount(offsets[mine], weights=distances[mine], minlength=n_days)
+            elevation_by_activity[activity] = [round(x, 2) for x in elevation.tolist()]
+            distance_by_activity[activity] = [round(x, 3) for x in distance.tolist()]
+        
+        return {
+            'file': file,
+            'count': len(records),
+            'distance': sum(w['distance'] for w in records),
+            'elevation': sum(w['elevation'] for w in records),
+            'first_date': records[0]['date'],
+            'last_date': records[-1]['date'],
+            'activities': activities,
+            'daily_elevation': [round(x, 2) for x in daily_elevation.tolist()],
+            'daily_distance': [round(x, 3) for x in daily_distance.tolist()],
+            'daily_elevation_by_activity': elevation_by_activity,
+            'daily_distance_by_activity': distance_by_activity
+        }
+
+    def _tombstone_path(self, year):
+        return os.path.join(self.archive_dir, f"{year}.tombstones.jsonl.gz")
+
+    def load_tombstones(self):
+        """Archived tombstones of every year, oldest first; only merges need them"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        tombstones = []
+        for file in sorted(os.listdir(self.archive_dir)):
+            if file.endswith(".tombstones.jsonl.gz"):
+                tombstones.extend(self._read_records(os.path.join(self.archive_dir, file)))
+        return tombstones
+
+    def archive(self, records):
+        """Move workouts and tombstones into their year's files; only the years touched are rewritten
+
+        Records the archive already holds are skipped, so archiving the same records
+        again (after a crash before the hot file was rewritten, or from a second
+        process loading at the same time) leaves the archive unchanged. Tombstones go
+        to a file of their own next to the year's segment and stay out of the manifest.
+        """
+        by_year, tombstones_by_year = {}, {}
+        for w in records:
+            (tombstones_by_year if w.get('deleted') else by_year).setdefault(w['date'][:4], []).append(w)
+        
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for year, tombstones in tombstones_by_year.items():
+            path = self._tombstone_path(year)
+            existing = self._read_records(path) if os.path.exists(path) else []
+            new_records = self._new_records(existing, tombstones)
+            if new_records:
+                self._write_records(path, sorted(existing + new_records, key=lambda w: w['date']))
+        if not by_year:
+            return
+        
+        manifest = dict(self.manifest())
+        for year, records in by_year.items():
+            if year in manifest:
+                existing = self.load_segment(year)
+                new_records = self._new_records(existing, records)
+                if not new_records:
+                    continue
+                records = existing + new_records
+            records.sort(key=lambda w: w['date'])
+            
+            file = f"{year}.jsonl.gz"
+            self._write_records(os.path.join(self.archive_dir, file), records)
+            manifest[year] = self._summarize(year, records, file)
+        
+        # The manifest goes last: until it is replaced, readers keep seeing the old archive
+        with open(self.manifest_filename + ".tmp", 'w') as f:
+            json.dump(manifest, f)
+        os.replace(self.manifest_filename + ".tmp", self.manifest_filename)
+
+    def daily_summaries(self):
+        """One {'date', 'activity', 'distance', 'elevation'} entry per active archived day and activity, from the aggregates alone
+
+        Segments summarized before the per-activity series existed give one entry per
+        day without an 'activity'.
+        """
+        days = []
+        for year, segment in sorted(self.manifest().items()):
+            start = datetime(int(year), 1, 1).date()
+            if 'daily_elevation_by_activity' in segment:
+                series = [(activity, elevation, segment['daily_distance_by_activity'][activity])
+                          for activity, elevation in segment['daily_elevation_by_activity'].items()]
+            else:
+                series = [(None, segment['daily_elevation'], segment['daily_distance'])]
+            for activity, elevations, distances in series:
+                for offset, (elevation, distance) in enumerate(zip(elevations, distances)):
+                    if elevation or distance:
+                        day = {'date': (start + timedelta(days=offset)).isoformat(), 'distance': distance, 'elevation': elevation}
+                        if activity is not None:
+                            day['activity'] = activity
+                        days.append(day)
+        days.sort(key=itemgetter('date'))
+        return days
+
+
+def content_key(workout):
+    """Exact identity of a workout's content"""
+    return (workout['date'], workout['activity'], float(workout['distance']), float(workout['elevation']))
+
+
+class ContentIndex:
+    """Hash index of workouts by content, matching distance/elevation within a tolerance"""
+
+    def __init__(self, distance_tolerance=0.0, elevation_tolerance=0.0):
+        self.distance_tolerance = distance_tolerance
+        self.elevation_tolerance = elevation_tolerance
+        self.buckets = {}
+
+    @staticmethod
+    def _bin(value, tolerance):
+        return int(value // tolerance) if tolerance > 0 else value
+
+    def _key(self, workout):
+        return (workout['date'], workout['activity'],
+                self._bin(float(workout['distance']), self.distance_tolerance),
+                self._bin(float(workout['elevation']), self.elevation_tolerance))
+
+    def find(self, workout):
+        """A stored workout matching this one, or None"""
+        date_, activity, distance_bin, elevation_bin = self._key(workout)
+        # A match within tolerance is at most one bucket away in each direction
+        distance_bins = (distance_bin - 1, distance_bin, distance_bin + 1) if self.distance_tolerance > 0 else (distance_bin,)
+        elevation_bins = (elevation_bin - 1, elevation_bin, elevation_bin + 1) if self.elevation_tolerance > 0 else (elevation_bin,)
+        for d in distance_bins:
+            for e in elevation_bins:
+                for candidate in self.buckets.get((date_, activity, d, e), ()):
+                    if (abs(float(candidate['distance']) - float(workout['distance'])) <= self.distance_tolerance and
+                            abs(float(candidate['elevation']) - float(workout['elevation'])) <= self.elevation_tolerance):
+                        return candidate
+        return None
+
+    def add(self, workout):
+        self.buckets.setdefault(self._key(workout), []).append(workout)
+
+    def take(self, workout):
+        """Remove and return a stored workout matching this one, or None, so each stored one matches once"""
+        match = self.find(workout)
+        if match is not None:
+            bucket = self.buckets[self._key(match)]
+            del bucket[next(i for i, w in enumerate(bucket) if w is match)]
+        return match
+
+
+def merge_histories(ours, theirs, distance_tolerance=0.0, elevation_tolerance=0.0):
+    """Merge two histories (workouts and tombstones) by date, dropping duplicates and deleted workouts
+
+    Only their records are matched against ours, and each of our records absorbs at
+    most one of theirs, so genuine same-day duplicates on either side still add up.
+    Our workouts are only ever removed by a new tombstone from their side; theirs are
+    dropped by any tombstone. Returns the merged workouts and tombstones plus what
+    changed relative to `ours`.
+    """
+    # Histories are stored in (or close to) date order, ascending or descending,
+    # which Timsort handles in linear time
+    by_date = itemgetter('date')
+    ours = sorted(ours, key=by_date)
+    theirs = sorted(theirs, key=by_date)
+    
+    result = {'workouts': [], 'tombstones': [], 'added': [], 'removed': [], 'duplicates': 0}
+    tagged = heapq.merge(((w['date'], 0, w) for w in ours), ((w['date'], 1, w) for w in theirs),
+                         key=itemgetter(0, 1))
+    
+    # Duplicates can only share a date, so the content indexes only ever hold one day
+    for _, day in groupby(tagged, key=itemgetter(0)):
+        sides = ([], [], [], [])  # our workouts, our tombstones, their workouts, their tombstones
+        for _, side, workout in day:
+            sides[2 * side + bool(workout.get('deleted'))].append(workout)
+        our_workouts, our_tombstones, their_workouts, their_tombstones = sides
+        
+        # Their tombstones that none of ours accounts for are new deletions
+        known = ContentIndex(distance_tolerance, elevation_tolerance)
+        for tombstone in our_tombstones:
+            known.add(tombstone)
+        new_tombstones = [t for t in their_tombstones if known.take(t) is None]
+        result['tombstones'].extend(our_tombstones + new_tombstones)
+        
+        deleting = ContentIndex(distance_tolerance, elevation_tolerance)
+        deleted = ContentIndex(distance_tolerance, elevation_tolerance)
+        for tombstone in new_tombstones:
+            deleting.add(tombstone)
+        for tombstone in our_tombstones + new_tombstones:
+            deleted.add(tombstone)
+        
+        kept = ContentIndex(distance_tolerance, elevation_tolerance)
+        for workout in our_workouts:
+            if deleting.take(workout) is not None:
+                result['removed'].append(workout)
+                continue
+            kept.add(workout)
+            result['workouts'].append(workout)
+        
+        for workout in their_workouts:
+            if deleted.take(workout) is not None:
+                continue
+            if kept.take(workout) is not None:
+                result['duplicates'] += 1
+                continue
+            result['workouts'].append(workout)
+            result['added'].append(workout)
+    
+    return result
+
+
+class WorkoutData:
+    """Challenge settings, the workout list and everything calculated from it, without any UI"""
+
+    UNDO_LIMIT = 100
+
+    def __init__(self, filename="workout_history.json", today=None):
+        # Challenge parameters
+        self.challenge_start = datetime(2025, 2, 1).date()
+        self.challenge_end = datetime(2026, 2, 1).date()
+        self.elevation_goal = 100000  # meters
+        
+        # Data storage
+        self.workouts = []
+        self.tombstones = []  # deleted workouts, kept so merges can tell deleted from missing
+        self.activities = ["Bike", "Run", "Hike", "Ski Tour"]
+        self.filename = filename
+        self.store = WorkoutStore(filename)
+        self.version = 0  # bumped on every change so caches know when they are stale
+        self.fixed_today = today  # pins "today" for reproducible runs; None follows the clock
+        
+        # Undo/redo: each entry is the operation that reverses one change
+        self.undo_stack = []
+        self.redo_stack = []
+        
+        # Goal completion forecast, recomputed after each change
+        self.goal_forecast = GoalForecast()
+        self.forecast = None
+        
+        # Load existing data
+        self.load_data()
+
+    def build_indexes(self):
+        # Daily totals of the archive, for metrics and views that reach back past the cutoff
+        self.archived_days = self.store.daily_summaries()
+        
+        # Sort and filter indexes for the history tab
+        self.history_index = HistoryIndex(self.workouts)
+        self.full_history = None  # archive + current, built when the history tab asks for it
+        
+        # Challenge days that have moved to the archive still count towards the challenge
+        start, end = self.challenge_start.isoformat(), self.challenge_end.isoformat()
+        self.archived_challenge_elevation = sum(d['elevation'] for d in self.archived_days if start <= d['date'] <= end)
+        
+        # Precomputed grid for the calendar heatmap
+        self.calendar_heatmap = CalendarHeatmap(self.challenge_start, self.challenge_end, self.archived_days + self.workouts)
+        
+        # Rolling volume and training load
+        self.training_metrics = TrainingMetrics(self.archived_days + self.workouts, self.today())
+        
+        self.forecast = None
+
+    def changed(self):
+        self.version += 1
+        self.forecast = None
+        self.full_history = None
+
+    def load_data(self):
+        self.loaded_signature = self.store.signature()
+        self.workouts = []
+        self.tombstones = []
+        
+        # Recorded positions refer to the old list
+        self.undo_stack = []
+        self.redo_stack = []
+        try:
+            records = self.store.load()
+            workouts = [w for w in records if not w.get('deleted')]
+            tombstones = [w for w in records if w.get('deleted')]
+            
+            # Anything older than the cutoff moves to the archive, tombstones included
+            start = self.archive_cutoff().isoformat()
+            past = [w for w in records if w['date'] < start]
+            if past:
+                self.store.archive(past)
+                workouts = [w for w in workouts if w['date'] >= start]
+                tombstones = [w for w in tombstones if w['date'] >= start]
+                self.store.save(workouts + tombstones)
+                self.loaded_signature = self.store.signature()
+            
+            self.workouts = workouts
+            self.tombstones = tombstones
+        finally:
+            self.build_indexes()
+
+    def save_data(self):
+        self.store.save(self.workouts + self.tombstones)
+        self.loaded_signature = self.store.signature()
+
+    def refresh(self):
+        """Reload if the history file was rewritten by another process since we read it"""
+        if self.store.signature() == self.loaded_signature:
+            return False
+        self.load_data()
+        self.changed()
+        return True
+
+    def today(self):
+        return self.fixed_today or date.today()
+
+    def archive_cutoff(self, today=None):
+        """Workouts dated before this belong in the archive: the challenge start or a year ago, whichever is later"""
+        today = today or self.today()
+        return max(self.challenge_start, today - timedelta(days=365))
+
+    def make_workout(self, workout_date, activity, distance, elevation):
+        """Validate raw input and return a workout entry, raising ValueError if it is invalid"""
+        workout_date = datetime.strptime(workout_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        distance = float(distance)
+        elevation = float(elevation)
+        if not (math.isfinite(distance) and math.isfinite(elevation)) or distance < 0 or elevation < 0:
+            raise ValueError("Distance and elevation must be non-negative numbers")
+        
+        if not activity or activity not in self.activities:
+            raise ValueError("Please select a valid activity")
+        
+        return {
+            "date": workout_date,
+            "activity": activity,
+            "distance": distance,
+            "elevation": elevation
+        }
+
+    def _apply(self, op):
+        """Remove op['remove'] positions, insert op['insert'] (position, workout) pairs and update the tombstones
+
+        Insert positions are where the workouts end up, so the inverse removes those
+        positions and re-inserts the removed workouts where they were. Returns the inverse op.
+        """
+        remove = op['remove']
+        insert = op['insert']
+        removed = [self.workouts[p] for p in remove]
+        inverse = {
+            'label': op['label'],
+            'remove': [position for position, _ in insert],
+            'insert': list(zip(remove, removed)),
+            'bury': op['unbury'],
+            'unbury': op['bury']
+        }
+        
+        # Undoing an append is always a truncation from the end of the list
+        if remove and remove[0] == len(self.workouts) - len(remove):
+            del self.workouts[remove[0]:]
+        elif remove:
+            gone = set(remove)
+            self.workouts[:] = [w for i, w in enumerate(self.workouts) if i not in gone]
+        if insert and insert[0][0] == len(self.workouts):
+            self.workouts.extend(w for _, w in insert)
+        elif insert:
+            placed = dict(insert)
+            kept = iter(self.workouts)
+            self.workouts[:] = [placed[i] if i in placed else next(kept)
+                                for i in range(len(self.workouts) + len(insert))]
+        added = [w for _, w in insert]
+        self.history_index.remove(remove)
+        self.history_index.insert([position for position, _ in insert], added)
+        
+        self.calendar_heatmap.update(removed, sign=-1)
+        self.calendar_heatmap.update(added)
+        
+        # Linear updates for a few workouts, one rebuild for bulk changes
+        if len(removed) + len(added) > 50 or not all(self.training_metrics.covers(w['date']) for w in added):
+            self.training_metrics.rebuild(self.archived_days + self.workouts, self.today())
+        else:
+            for w in removed:
+                self.training_metrics.add(w, sign=-1)
+            for w in added:
+                self.training_metrics.add(w)
+        
+        # Ops carry only the tombstones they add and drop, matched by identity
+        if op['unbury']:
+            dropped = {id(t) for t in op['unbury']}
+            self.tombstones = [t for t in self.tombstones if id(t) not in dropped]
+        self.tombstones.extend(op['bury'])
+        self.changed()
+        return inverse
+
+    def perform(self, label, remove=(), insert=(), append=(), bury=(), unbury=()):
+        """Apply a change and record how to undo it
+
+        `insert` holds (position, workout) pairs placed after the removals; `append`
+        adds workouts at the end of the list. `bury` adds tombstones and `unbury`
+        drops existing ones.
+        """
+        remove = sorted(remove)
+        insert = sorted(insert, key=itemgetter(0))
+        end = len(self.workouts) - len(remove) + len(insert)
+        op = {
+            'label': label,
+            'remove': remove,
+            'insert': insert + list(enumerate(append, start=end)),
+            'bury': list(bury),
+            'unbury': list(unbury)
+        }
+        self.undo_stack.append(self._apply(op))
+        del self.undo_stack[:-self.UNDO_LIMIT]
+        self.redo_stack = []
+
+    def undo(self):
+        """Undo the last change; returns its label, or None if there is nothing to undo"""
+        if not self.undo_stack:
+            return None
+        op = self.undo_stack.pop()
+        self.redo_stack.append(self._apply(op))
+        return op['label']
+
+    def redo(self):
+        """Redo the last undone change; returns its label, or None if there is nothing to redo"""
+        if not self.redo_stack:
+            return None
+        op = self.redo_stack.pop()
+        self.undo_stack.append(self._apply(op))
+        return op['label']
+
+    def add_workout(self, workout):
+        self.add_workouts([workout], "add workout")
+
+    def add_workouts(self, workouts, label="import workouts"):
+        # Re-entering a deleted workout brings it back, so its tombstone goes
+        unbury = []
+        if self.tombstones:
+            keys = {content_key(w) for w in workouts}
+            unbury = [t for t in self.tombstones if content_key(t) in keys]
+        self.perform(label, append=workouts, unbury=unbury)
+
+    def delete_workouts(self, workout_date, activity):
+        """Remove every workout on a date for an activity; returns how many were removed"""
+        removed = [i for i, w in enumerate(self.workouts) if w['date'] == workout_date and w['activity'] == activity]
+        if removed:
+            self.perform("delete workout", remove=removed, bury=[dict(self.workouts[i], deleted=True) for i in removed])
+        return len(removed)
+
+    def find_workout(self, workout):
+        """Current list position of a workout, by identity or else by content; None if it is gone"""
+        for i, w in enumerate(self.workouts):
+            if w is workout:
+                return i
+        key = content_key(workout)
+        for i, w in enumerate(self.workouts):
+            if content_key(w) == key:
+                return i
+        return None
+
+    def edit_workout(self, position, workout):
+        # The old version is tombstoned so a merge doesn't bring it back
+        old = self.workouts[position]
+        key = content_key(workout)
+        unbury = [t for t in self.tombstones if content_key(t) == key]
+        bury = [dict(old, deleted=True)] if content_key(old) != key else []
+        self.perform("edit workout", remove=[position], insert=[(position, workout)], bury=bury, unbury=unbury)
+
+    def merge_history(self, filename, distance_tolerance=0.0, elevation_tolerance=0.0):
+        """Merge another history file (and its archive) into ours; returns the merge summary"""
+        self.refresh()
+        other = WorkoutStore(filename)
+        records = other.load()
+        if not isinstance(records, list) or not all(isinstance(w, dict) for w in records):
+            raise ValueError(f"{os.path.basename(filename)} is not a workout history (expected a list of workouts)")
+        theirs = other.load_segments() + other.load_tombstones() + records
+        archived_tombstones = self.store.load_tombstones()
+        ours = self.all_workouts() + archived_tombstones + self.tombstones
+        result = merge_histories(ours, theirs, distance_tolerance, elevation_tolerance)
+        
+        # New workouts and tombstones older than the cutoff go straight into the archive;
+        # the archive is immutable, so only the current part of the merge is an undoable change
+        start = self.archive_cutoff().isoformat()
+        known_ids = {id(t) for t in archived_tombstones + self.tombstones}
+        new_tombstones = [t for t in result['tombstones'] if id(t) not in known_ids]
+        past = [w for w in result['added'] + new_tombstones if w['date'] < start]
+        if past:
+            self.store.archive(past)
+        
+        removed_ids = {id(w) for w in result['removed']}
+        remove = [i for i, w in enumerate(self.workouts) if id(w) in removed_ids]
+        append = [w for w in result['added'] if w['date'] >= start]
+        merged_ids = {id(t) for t in result['tombstones']}
+        self.perform(f"merge {os.path.basename(filename)}", remove=remove, append=append,
+                     bury=[t for t in new_tombstones if t['date'] >= start],
+                     unbury=[t for t in self.tombstones if id(t) not in merged_ids])
+        if past:
+            self.build_indexes()
+        result['removed'] = [w for w in result['removed'] if w['date'] >= start]
+        self.save_data()
+        return result
+
+    def latest_date(self):
+        """Most recent workout date across the current data and the archive, or None"""
+        candidates = [segment['last_date'] for segment in self.store.manifest().values()]
+        if len(self.history_index):
+            candidates.append(str(self.history_index.dates.max()))
+        return max(candidates) if candidates else None
+
+    def recent_workouts(self, days):
+        """Workouts from the last `days` days of the history; archive segments are read only if the window reaches them"""
+        latest = self.latest_date()
+        if latest is None:
+            return []
+        since = (datetime.strptime(latest, "%Y-%m-%d").date() - timedelta(days=days)).isoformat()
+        archived = self.store.load_segments(since)
+        return archived + self.workouts if archived else self.workouts
+
+    def all_workouts(self):
+        """The whole history, archive first (loads every segment)"""
+        return self.store.load_segments() + self.workouts
+
+    def full_history_index(self):
+        """(index, workouts, offset of the first current workout) over archive + current, rebuilt after changes"""
+        if self.full_history is None:
+            workouts = self.all_workouts()
+            self.full_history = (HistoryIndex(workouts), workouts, len(workouts) - len(self.workouts))
+        return self.full_history
+
+    def calculate_totals(self):
+        """All-time totals from the current workouts plus the archive aggregates"""
+        segments = self.store.manifest().values()
+        return {
+            'count': len(self.workouts) + sum(s['count'] for s in segments),
+            'distance': sum(w['distance'] for w in self.workouts) + sum(s['distance'] for s in segments),
+            'elevation': sum(w['elevation'] for w in self.workouts) + sum(s['elevation'] for s in segments)
+        }
+
+    def calculate_challenge_stats(self, today=None):
+        # Calculate elevation gain during challenge period
+        challenge_elevation = sum(w['elevation'] for w in self.workouts 
+                                if self.challenge_start <= datetime.strptime(w['date'], "%Y-%m-%d").date() <= self.challenge_end)
+        
+        return self._challenge_summary(challenge_elevation + self.archived_challenge_elevation, today)
+
+    def _challenge_summary(self, challenge_elevation, today=None):
+        today = today or self.today()
+        
+        # Calculate remaining elevation needed
+        remaining_elevation = max(0, self.elevation_goal - challenge_elevation)
+        
+        # Calculate days elapsed and remaining in challenge
+        if today < self.challenge_start:
+            days_elapsed = 0
+            days_remaining = (self.challenge_end - self.challenge_start).days
+        elif today > self.challenge_end:
+            days_elapsed = (self.challenge_end - self.challenge_start).days
+            days_remaining = 0
+        else:
+            days_elapsed = (today - self.challenge_start).days
+            days_remaining = (self.challenge_end - today).days
+        
+        # Calculate progress percentage
+        progress_percentage = (challenge_elevation / self.elevation_goal) * 100
+        
+        # Calculate required daily average for remaining days
+        required_daily_avg = remaining_elevation / max(1, days_remaining) if days_remaining > 0 else 0
+        
+        # Calculate current daily average
+        current_daily_avg = challenge_elevation / max(1, days_elapsed) if days_elapsed > 0 else 0
+        
+        return {
+            'challenge_elevation': challenge_elevation,
+            'remaining_elevation': remaining_elevation,
+            'progress_percentage': progress_percentage,
+            'required_daily_avg': required_daily_avg,
+            'current_daily_avg': current_daily_avg,
+            'days_remaining': days_remaining
+        }
+    
+# Add this method to calculate daily data
+    def calculate_daily_data(self, days=14):
+        """Calculate daily elevation data for the specified number of recent days"""
+        workouts = self.recent_workouts(days)
+        if not workouts:
+            return {'dates': [], 'totals': []}
+        
+        # Convert workout data to DataFrame
+        df = pd.DataFrame(workouts)
+        df['date'] = pd.to_datetime(df['date'])
+        
+        # Set the date range for the last N days
+        end_date = max(df['date'])
+        start_date = end_date - timedelta(days=days-1)  # Show last N days
+        
+        # Create a date range for all days in the period
+        date_range = pd.date_range(start=start_date, end=end_date)
+        
+        # Create daily bins for the elevation data
+        df = df[df['date'] >= start_date]
+        daily_totals = df.resample('D', on='date')['elevation'].sum().reindex(date_range).fillna(0)
+        
+        # Format date labels
+        date_labels = [d.strftime('%b %d') for d in daily_totals.index]
+        
+        return {
+            'dates': date_labels,
+            'totals': daily_totals.values
+        }
+
+    def calculate_activity_breakdown(self):
+        breakdown = []
+        for activity in self.activities:
+            activity_workouts = [w for w in self.workouts if w['activity'] == activity]
+            count = len(activity_workouts)
+            distance = sum(w['distance'] for w in activity_workouts)
+            elevation = sum(w['elevation'] for w in activity_workouts)
+            breakdown.append(self._activity_row(activity, count, distance, elevation))
+        return breakdown
+
+    def _activity_row(self, activity, count, distance, elevation):
+        # Archived years contribute their precomputed totals
+        for segment in self.store.manifest().values():
+            totals = segment['activities'].get(activity)
+            if totals:
+                count += totals['count']
+                distance += totals['distance']
+                elevation += totals['elevation']
+        
+        return {
+            'activity': activity,
+            'count': count,
+            'distance': distance,
+            'elevation': elevation,
+            'vertical_per_km': elevation / distance if distance > 0 else 0.0
+        }
+
+    def calculate_forecast(self):
+        # Cached until the next data change (changed() clears it)
+        if self.forecast is None:
+            challenge_stats = self.fast_challenge_stats()
+            self.forecast = self.goal_forecast.run(self.archived_days + self.workouts, self.challenge_start, self.challenge_end,
+                                                   self.elevation_goal, challenge_stats['challenge_elevation'],
+                                                   self.today()) or {}
+        return self.forecast
+
+    def calculate_weekly_data(self):
+        workouts = self.recent_workouts(7 * 12)
+        if not workouts:
+            return {'weeks': [], 'totals': []}
+        
+        # Convert workout data to DataFrame
+        df = pd.DataFrame(workouts)
+        df['date'] = pd.to_datetime(df['date'])
+        
+        # Set the date range
+        end_date = max(df['date'])
+        start_date = end_date - timedelta(weeks=11)  # Show last 12 weeks
+        
+        # Create weekly bins
+        df = df[df['date'] >= start_date]
+        weekly_totals = df.resample('W-MON', on='date')['elevation'].sum()
+        
+        # Format week labels
+        week_labels = [d.strftime('%b %d') for d in weekly_totals.index]
+        
+        return {
+            'weeks': week_labels,
+            'totals': weekly_totals.values
+        }
+
+
+    def calculate_monthly_data(self):
+        workouts = self.recent_workouts(366)
+        if not workouts:
+            return {'months': [], 'totals': []}
+        
+        df = pd.DataFrame(workouts)
+        df['date'] = pd.to_datetime(df['date'])
+        
+        # Set the date range
+        end_date = max(df['date'])
+        start_date = end_date - pd.DateOffset(months=11)  # Show last 12 months
+        
+        # Create monthly bins using 'ME' (Month End) instead of deprecated 'M'
+        df = df[df['date'] >= start_date]
+        monthly_totals = df.resample('ME', on='date')['elevation'].sum()
+        
+        # Format month labels
+        month_labels = [d.strftime('%b %Y') for d in monthly_totals.index]
+        
+        return {
+            'months': month_labels,
+            'totals': monthly_totals.values
+        }
+
+    # Array-based versions of the calculate_* methods above, answered from the
+    # history index without building a DataFrame. The app and the API use these;
+    # the calculate_* versions are the reference check_aggregations.py compares them with.
+
+    def _reaches_archive(self, since):
+        return any(segment['last_date'] >= since for segment in self.store.manifest().values())
+
+    def fast_challenge_stats(self, today=None):
+        challenge_elevation = self.history_index.window_total("Elevation", self.challenge_start, self.challenge_end)
+        return self._challenge_summary(float(challenge_elevation) + self.archived_challenge_elevation, today)
+
+    def fast_activity_breakdown(self):
+        index = self.history_index
+        breakdown = []
+        for activity in self.activities:
+            positions = index.positions.get(activity, np.empty(0, dtype=np.intp))
+            breakdown.append(self._activity_row(activity, len(positions), float(index.distance[positions].sum()),
+                                                float(index.elevation[positions].sum())))
+        return breakdown
+
+    def fast_daily_data(self, days=14):
+        latest = self.latest_date()
+        if latest is None:
+            return {'dates': [], 'totals': []}
+        end_date = datetime.strptime(latest, "%Y-%m-%d").date()
+        start_date = end_date - timedelta(days=days - 1)
+        if self._reaches_archive(start_date.isoformat()):
+            return self.calculate_daily_data(days)
+        
+        start = np.datetime64(start_date, 'D')
+        first, totals = self.history_index.binned_elevation(start_date, end_date, lambda d: (d - start).astype(int))
+        daily_totals = np.zeros(days)
+        if first is not None:
+            daily_totals[first:first + len(totals)] = totals
+        return {
+            'dates': [(start_date + timedelta(days=i)).strftime('%b %d') for i in range(days)],
+            'totals': daily_totals
+        }
+
+    def fast_weekly_data(self):
+        latest = self.latest_date()
+        if latest is None:
+            return {'weeks': [], 'totals': []}
+        end_date = datetime.strptime(latest, "%Y-%m-%d").date()
+        start_date = end_date - timedelta(weeks=11)
+        if self._reaches_archive(start_date.isoformat()):
+            return self.calculate_weekly_data()
+        
+        # Weeks end on Monday ('W-MON'): each date goes to the Monday on or after it,
+        # counted in weeks from 1970-01-05 (the epoch itself was a Thursday)
+        def week_of(dates):
+            days = dates.astype(int) - 4
+            return (days + 6) // 7
+        first, totals = self.history_index.binned_elevation(start_date, end_date, week_of)
+        return {
+            'weeks': [(date(1970, 1, 5) + timedelta(weeks=int(first) + i)).strftime('%b %d') for i in range(len(totals))],
+            'totals': totals
+        }
+
+    def fast_monthly_data(self):
+        latest = self.latest_date()
+        if latest is None:
+            return {'months': [], 'totals': []}
+        end_date = datetime.strptime(latest, "%Y-%m-%d").date()
+        
+        # Same day eleven months earlier, clipped to the month's length (pd.DateOffset(months=11))
+        year, month = divmod(end_date.year * 12 + end_date.month - 1 - 11, 12)
+        start_date = date(year, month + 1, min(end_date.day, calendar.monthrange(year, month + 1)[1]))
+        if self._reaches_archive(start_date.isoformat()):
+            return self.calculate_monthly_data()
+        
+        first, totals = self.history_index.binned_elevation(
+            start_date, end_date, lambda d: d.astype('datetime64[M]').astype(int))
+        months = [int(first) + i for i in range(len(totals))]
+        return {
+            'months': [date(1970 + m // 12, m % 12 + 1, 1).strftime('%b %Y') for m in months],
+            'totals': totals
+        }
+
+
+def to_json(value):
+    # numpy arrays and scalars, dates
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class StatsServer:
+    """Local JSON API over the workout data, answered from a per-version response cache"""
+
+    REASONS = {200: "OK", 201: "Created", 304: "Not Modified", 400: "Bad Request",
+               404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+    def __init__(self, data, host="127.0.0.1", port=8765):
+        self.data = data
+        self.host = host
+        self.port = port
+        self.cache = {}  # request -> (etag, body), for the data version and day in cache_version
+        self.cache_version = None
+        self.server = None
+
+    def request(self, path, query):
+        """Normalized (endpoint, parameters) for a GET, or None for an unknown endpoint"""
+        path = path.rstrip('/') or '/'
+        if path == "/series/daily":
+            days = int(query.get('days', ['14'])[0])
+            if not 1 <= days <= 3660:
+                raise ValueError("days must be between 1 and 3660")
+            return (path, days)
+        if path in ("/stats", "/activities", "/series/weekly", "/series/monthly"):
+            return (path,)
+        return None
+
+    def payload(self, request):
+        path = request[0]
+        if path == "/stats":
+            stats = self.data.fast_challenge_stats()
+            stats.update({
+                'elevation_goal': self.data.elevation_goal,
+                'challenge_start': self.data.challenge_start.isoformat(),
+                'challenge_end': self.data.challenge_end.isoformat()
+            })
+            return stats
+        if path == "/activities":
+            return self.data.fast_activity_breakdown()
+        if path == "/series/daily":
+            return self.data.fast_daily_data(days=request[1])
+        if path == "/series/weekly":
+            return self.data.fast_weekly_data()
+        if path == "/series/monthly":
+            return self.data.fast_monthly_data()
+        return None
+
+    def get(self, target, headers):
+        parts = urlsplit(target)
+        
+        request = self.request(parts.path, parse_qs(parts.query))
+        if request is None:
+            return 404, {}, {'error': f"Unknown endpoint {parts.path}"}
+        
+        # Stats depend on today's date as well as the data; entries for an older
+        # version are dropped, so the cache never holds more than one per request
+        self.data.refresh()
+        version = (self.data.version, self.data.today())
+        if version != self.cache_version:
+            self.cache = {}
+            self.cache_version = version
+        
+        cached = self.cache.get(request)
+        if cached is None:
+            body = json.dumps(self.payload(request), default=to_json, allow_nan=False).encode()
+            etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+            cached = (etag, body)
+            self.cache[request] = cached
+        
+        etag, body = cached
+        if_none_match = headers.get('if-none-match', '')
+        if if_none_match == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag, 'Cache-Control': 'no-cache'}, body
+
+    def post_workouts(self, body):
+        try:
+            payload = json.loads(body or b'null')
+            items = payload if isinstance(payload, list) else [payload]
+            workouts = [self.data.make_workout(item.get('date'), item.get('activity'),
+                                               item.get('distance'), item.get('elevation'))
+                        for item in items]
+        except (AttributeError, TypeError, ValueError) as e:
+            return 400, {}, {'error': str(e) or "Invalid workout"}
+        
+        # Same path as the app: pick up outside changes, append, write the shared file
+        self.data.refresh()
+        self.data.add_workouts(workouts, "add workouts via API")
+        self.data.save_data()
+        return 201, {}, workouts
+
+    def dispatch(self, method, target, headers, body):
+        path = urlsplit(target).path
+        try:
+            if path == "/workouts":
+                if method != "POST":
+                    return 405, {'Allow': 'POST'}, {'error': "Use POST to add workouts"}
+                return self.post_workouts(body)
+            if method not in ("GET", "HEAD"):
+                return 405, {'Allow': 'GET, HEAD'}, {'error': f"{method} not allowed"}
+            return self.get(target, headers)
+        except ValueError as e:
+            return 400, {}, {'error': str(e)}
+        except Exception as e:
+            return 500, {}, {'error': str(e)}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+                
+                status, extra_headers, response = self.dispatch(method, target, headers, body)
+                if not isinstance(response, bytes):
+                    response = json.dumps(response, default=to_json, allow_nan=False).encode()
+                
+                keep_alive = version == "HTTP/1.1" and headers.get('connection', '').lower() != 'close'
+                head_lines = [f"HTTP/1.1 {status} {self.REASONS[status]}",
+                              f"Content-Length: {len(response)}",
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if status != 304:
+                    head_lines.append("Content-Type: application/json")
+                head_lines += [f"{name}: {value}" for name, value in extra_headers.items()]
+                writer.write(("\r\n".join(head_lines) + "\r\n\r\n").encode('latin-1'))
+                if method != "HEAD":
+                    writer.write(response)
+                await writer.drain()
+                
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve(self):
+        await self.start()
+        print(f"Serving workout stats on http://{self.host}:{self.port}")
+        async with self.server:
+            await self.server.serve_forever()
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+
+class WorkoutTracker(WorkoutData):
     def __init__(self, root):
         self.root = root
         self.root.title("Workout Tracker")
         self.root.geometry("900x900")
         
-        # Challenge parameters
-        self.challenge_start = datetime(2025, 2, 1).date()
-        self.challenge_end = datetime(2026, 2, 1).date()
-        self.elevation_goal = 100000  # meters
-        
-        # Data storage
-        self.workouts = []
-        self.activities = ["Bike", "Run", "Hike", "Ski Tour"]
-        self.filename = "workout_history.json"
+        # Load data and build the indexes
+        super().__init__()
         
-        # Load existing data
-        self.load_data()
+        # History tab sort and filter state
+        self.history_sort = ("Date", True)  # (column, descending)
+        self.history_filter = {}
         
         # Configure styles
         self.setup_styles()
@@ -91,6 +1706,10 @@ class WorkoutTracker:
         activities_frame = ttk.LabelFrame(upper_section, text="Activity Breakdown", padding=10)
         activities_frame.pack(fill='x', padx=10, pady=5)
         
+        # Training load frame
+        load_frame = ttk.LabelFrame(upper_section, text="Training Load", padding=10)
+        load_frame.pack(fill='x', padx=10, pady=5)
+        
         # Lower section for graph
         graph_frame = ttk.LabelFrame(stats_container, text="Elevation Progress", padding=10)
         graph_frame.pack(fill='both', expand=True, padx=10, pady=5)
@@ -102,7 +1721,7 @@ class WorkoutTracker:
         self.create_graph(graph_frame)
         
         # Challenge Progress Section
-        challenge_stats = self.calculate_challenge_stats()
+        challenge_stats = self.fast_challenge_stats()
         
         # Progress bar frame
         progress_frame = ttk.Frame(challenge_frame)
@@ -160,9 +1779,29 @@ class WorkoutTracker:
                  text=f"{yearly_target:.1f}m per day"
                  ).grid(row=2, column=1, columnspan=3, sticky='w', padx=5)
         
+        # Forecast row, or the outcome once the challenge is over
+        forecast = self.calculate_forecast()
+        if forecast and forecast['final']:
+            total = forecast['p50'][-1]
+            if forecast['probability']:
+                forecast_text = f"Goal reached ({total:,.0f} m)"
+            else:
+                forecast_text = f"Goal missed ({total:,.0f} of {self.elevation_goal:,} m)"
+        elif forecast:
+            forecast_text = (f"{forecast['probability'] * 100:.0f}% "
+                             f"(P10 / P50 / P90: {forecast['p10'][-1]:,.0f} / {forecast['p50'][-1]:,.0f} / {forecast['p90'][-1]:,.0f} m)")
+        else:
+            forecast_text = "Not enough history"
+        ttk.Label(stats_grid, text="Goal Result:" if forecast and forecast['final'] else "Goal Probability:",
+                 style="Header.TLabel").grid(row=3, column=0, sticky='w', padx=5)
+        ttk.Label(stats_grid,
+                 text=forecast_text
+                 ).grid(row=3, column=1, columnspan=3, sticky='w', padx=5)
+        
         # Overall Stats Section
-        total_distance = sum(w['distance'] for w in self.workouts)
-        total_elevation = sum(w['elevation'] for w in self.workouts)
+        totals = self.calculate_totals()
+        total_distance = totals['distance']
+        total_elevation = totals['elevation']
         
         overall_grid = ttk.Frame(overall_frame)
         overall_grid.pack(fill='x')
@@ -179,8 +1818,26 @@ class WorkoutTracker:
                  text=f"{total_elevation:,.0f} m"
                  ).grid(row=1, column=1, sticky='w', padx=5)
         
+        # Training Load Section
+        load = self.training_metrics.current(self.today()) or dict.fromkeys(
+            ('elevation_7', 'elevation_28', 'distance_7', 'distance_28', 'acute_load', 'chronic_load'), 0)
+        
+        load_grid = ttk.Frame(load_frame)
+        load_grid.pack(fill='x')
+        
+        load_rows = [
+            ("7-Day Elevation:", f"{load['elevation_7']:,.0f} m", "7-Day Distance:", f"{load['distance_7']:,.1f} km",
+             "Acute Load (7d):", f"{load['acute_load']:,.0f} m/day"),
+            ("28-Day Elevation:", f"{load['elevation_28']:,.0f} m", "28-Day Distance:", f"{load['distance_28']:,.1f} km",
+             "Chronic Load (42d):", f"{load['chronic_load']:,.0f} m/day")
+        ]
+        for row, cells in enumerate(load_rows):
+            for column, text in enumerate(cells):
+                ttk.Label(load_grid, text=text,
+                         style="Header.TLabel" if column % 2 == 0 else "TLabel").grid(row=row, column=column, sticky='w', padx=5)
+        
         # Activity Breakdown Section
-        columns = ("Activity", "Count", "Distance", "Elevation")
+        columns = ("Activity", "Count", "Distance", "Elevation", "Vertical/km")
         self.activity_tree = ttk.Treeview(activities_frame, columns=columns,
                                         show="headings", height=6)
         
@@ -189,7 +1846,8 @@ class WorkoutTracker:
             "Activity": 150,
             "Count": 100,
             "Distance": 150,
-            "Elevation": 150
+            "Elevation": 150,
+            "Vertical/km": 100
         }
         
         for col in columns:
@@ -199,17 +1857,13 @@ class WorkoutTracker:
         self.activity_tree.pack(fill='both', expand=True)
         
         # Add activity data
-        for activity in self.activities:
-            activity_workouts = [w for w in self.workouts if w['activity'] == activity]
-            count = len(activity_workouts)
-            distance = sum(w['distance'] for w in activity_workouts)
-            elevation = sum(w['elevation'] for w in activity_workouts)
-            
+        for row in self.fast_activity_breakdown():
             self.activity_tree.insert("", "end", values=(
-                activity,
-                count,
-                f"{distance:,.1f} km",
-                f"{elevation:,.0f} m"
+                row['activity'],
+                row['count'],
+                f"{row['distance']:,.1f} km",
+                f"{row['elevation']:,.0f} m",
+                f"{row['vertical_per_km']:,.0f} m/km"
             ))
 
     def setup_input_tab(self):
@@ -244,8 +1898,53 @@ class WorkoutTracker:
         save_button.grid(row=4, column=0, columnspan=2, pady=20)
 
     def setup_history_tab(self):
+        # Filter controls
+        filter_frame = ttk.LabelFrame(self.history_frame, text="Filter", padding=10)
+        filter_frame.pack(fill='x', padx=10, pady=(10, 0))
+        
+        self.filter_vars = {
+            'start_date': tk.StringVar(),
+            'end_date': tk.StringVar(),
+            'activity': tk.StringVar(value="All"),
+            'min_distance': tk.StringVar(),
+            'max_distance': tk.StringVar(),
+            'min_elevation': tk.StringVar(),
+            'max_elevation': tk.StringVar()
+        }
+        
+        ttk.Label(filter_frame, text="From:", style="Header.TLabel").grid(row=0, column=0, sticky='e', padx=5, pady=2)
+        ttk.Entry(filter_frame, textvariable=self.filter_vars['start_date'], width=12).grid(row=0, column=1, sticky='w', padx=5, pady=2)
+        ttk.Label(filter_frame, text="To:", style="Header.TLabel").grid(row=0, column=2, sticky='e', padx=5, pady=2)
+        ttk.Entry(filter_frame, textvariable=self.filter_vars['end_date'], width=12).grid(row=0, column=3, sticky='w', padx=5, pady=2)
+        ttk.Label(filter_frame, text="Activity:", style="Header.TLabel").grid(row=0, column=4, sticky='e', padx=5, pady=2)
+        ttk.Combobox(filter_frame, textvariable=self.filter_vars['activity'],
+                     values=["All"] + self.activities, state="readonly", width=12).grid(row=0, column=5, sticky='w', padx=5, pady=2)
+        
+        ttk.Label(filter_frame, text="Distance (km):", style="Header.TLabel").grid(row=1, column=0, sticky='e', padx=5, pady=2)
+        ttk.Entry(filter_frame, textvariable=self.filter_vars['min_distance'], width=12).grid(row=1, column=1, sticky='w', padx=5, pady=2)
+        ttk.Label(filter_frame, text="to").grid(row=1, column=2, padx=5, pady=2)
+        ttk.Entry(filter_frame, textvariable=self.filter_vars['max_distance'], width=12).grid(row=1, column=3, sticky='w', padx=5, pady=2)
+        
+        ttk.Label(filter_frame, text="Elevation (m):", style="Header.TLabel").grid(row=2, column=0, sticky='e', padx=5, pady=2)
+        ttk.Entry(filter_frame, textvariable=self.filter_vars['min_elevation'], width=12).grid(row=2, column=1, sticky='w', padx=5, pady=2)
+        ttk.Label(filter_frame, text="to").grid(row=2, column=2, padx=5, pady=2)
+        ttk.Entry(filter_frame, textvariable=self.filter_vars['max_elevation'], width=12).grid(row=2, column=3, sticky='w', padx=5, pady=2)
+        
+        ttk.Button(filter_frame, text="Apply", command=self.apply_history_filter).grid(row=1, column=5, sticky='ew', padx=5, pady=2)
+        ttk.Button(filter_frame, text="Clear", command=self.clear_history_filter).grid(row=2, column=5, sticky='ew', padx=5, pady=2)
+        
+        # Past challenge years live in the archive and are only read when asked for
+        self.show_archive = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Include archived workouts", variable=self.show_archive,
+                        command=self.update_history).grid(row=0, column=6, sticky='w', padx=5, pady=2)
+        
+        # Apply the filter with Enter from any field
+        for child in filter_frame.winfo_children():
+            if isinstance(child, ttk.Entry):
+                child.bind('<Return>', lambda e: self.apply_history_filter())
+        
         # Create treeview for workout history
-        columns = ("Date", "Activity", "Distance", "Elevation")
+        columns = HistoryIndex.COLUMNS
         self.history_tree = ttk.Treeview(self.history_frame, columns=columns, show="headings")
         
         # Set column headings and widths
@@ -257,7 +1956,7 @@ class WorkoutTracker:
         }
         
         for col in columns:
-            self.history_tree.heading(col, text=col)
+            self.history_tree.heading(col, text=col, command=lambda c=col: self.sort_history(c))
             self.history_tree.column(col, width=column_widths[col])
         
         # Pack the treeview with scrollbar
@@ -269,202 +1968,68 @@ class WorkoutTracker:
         self.history_tree.configure(yscrollcommand=scrollbar.set)
         
         # Delete button
-        delete_button = ttk.Button(self.history_frame, text="Delete Selected", command=self.delete_workout, padding=10)
-        delete_button.pack(pady=10)
-        
-        # Load existing workouts into history
-        self.update_history()
-
-    def calculate_challenge_stats(self):
-        today = date.today()
-        
-        # Calculate elevation gain during challenge period
-        challenge_elevation = sum(w['elevation'] for w in self.workouts 
-                                if self.challenge_start <= datetime.strptime(w['date'], "%Y-%m-%d").date() <= self.challenge_end)
-        
-        # Calculate remaining elevation needed
-        remaining_elevation = max(0, self.elevation_goal - challenge_elevation)
-        
-        # Calculate days elapsed and remaining in challenge
-        if today < self.challenge_start:
-            days_elapsed = 0
-            days_remaining = (self.challenge_end - self.challenge_start).days
-        elif today > self.challenge_end:
-            days_elapsed = (self.challenge_end - self.challenge_start).days
-            days_remaining = 0
-        else:
-            days_elapsed = (today - self.challenge_start).days
-            days_remaining = (self.challenge_end - today).days
-        
-        # Calculate progress percentage
-        progress_percentage = (challenge_elevation / self.elevation_goal) * 100
-        
-        # Calculate required daily average for remaining days
-        required_daily_avg = remaining_elevation / max(1, days_remaining) if days_remaining > 0 else 0
-        
-        # Calculate current daily average
-        current_daily_avg = challenge_elevation / max(1, days_elapsed) if days_elapsed > 0 else 0
-        
-        return {
-            'challenge_elevation': challenge_elevation,
-            'remaining_elevation': remaining_elevation,
-            'progress_percentage': progress_percentage,
-            'required_daily_avg': required_daily_avg,
-            'current_daily_avg': current_daily_avg,
-            'days_remaining': days_remaining
-        }
-    
-# Add this method to calculate daily data
-    def calculate_daily_data(self, days=14):
-        """Calculate daily elevation data for the specified number of recent days"""
-        if not self.workouts:
-            return {'dates': [], 'totals': []}
+        buttons_frame = ttk.Frame(self.history_frame)
+        buttons_frame.pack(pady=10)
+        delete_button = ttk.Button(buttons_frame, text="Delete Selected", command=self.delete_workout, padding=10)
+        delete_button.pack(side='left', padx=5)
         
-        # Convert workout data to DataFrame
-        df = pd.DataFrame(self.workouts)
-        df['date'] = pd.to_datetime(df['date'])
+        # Edit button
+        edit_button = ttk.Button(buttons_frame, text="Edit Selected", command=self.edit_selected_workout, padding=10)
+        edit_button.pack(side='left', padx=5)
         
-        # Set the date range for the last N days
-        end_date = max(df['date'])
-        start_date = end_date - timedelta(days=days-1)  # Show last N days
+        # Merge button
+        merge_button = ttk.Button(buttons_frame, text="Merge History...", command=self.merge_workouts, padding=10)
+        merge_button.pack(side='left', padx=5)
         
-        # Create a date range for all days in the period
-        date_range = pd.date_range(start=start_date, end=end_date)
+        # Undo/redo buttons
+        self.undo_button = ttk.Button(buttons_frame, text="Undo", command=self.undo_change, padding=10)
+        self.undo_button.pack(side='left', padx=5)
+        self.redo_button = ttk.Button(buttons_frame, text="Redo", command=self.redo_change, padding=10)
+        self.redo_button.pack(side='left', padx=5)
         
-        # Create daily bins for the elevation data
-        df = df[df['date'] >= start_date]
-        daily_totals = df.resample('D', on='date')['elevation'].sum().reindex(date_range).fillna(0)
+        self.root.bind_all('<Control-z>', lambda e: self.undo_change())
+        self.root.bind_all('<Control-y>', lambda e: self.redo_change())
+        self.root.bind_all('<Control-Shift-Z>', lambda e: self.redo_change())
         
-        # Format date labels
-        date_labels = [d.strftime('%b %d') for d in daily_totals.index]
+        # Load existing workouts into history
+        self.update_history()
+
+    def apply_history_filter(self):
+        try:
+            history_filter = {}
+            for key in ('start_date', 'end_date'):
+                value = self.filter_vars[key].get().strip()
+                if value:
+                    history_filter[key] = datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+            for key in ('min_distance', 'max_distance', 'min_elevation', 'max_elevation'):
+                value = self.filter_vars[key].get().strip()
+                if value:
+                    history_filter[key] = float(value)
+            activity = self.filter_vars['activity'].get()
+            if activity and activity != "All":
+                history_filter['activity'] = activity
+        except ValueError:
+            messagebox.showerror("Error", "Dates must be YYYY-MM-DD and distance/elevation limits must be numbers")
+            return
         
-        return {
-            'dates': date_labels,
-            'totals': daily_totals.values
-        }
+        self.history_filter = history_filter
+        self.update_history()
 
-        # Add this method to create the daily graphs
-        def create_daily_graphs(self, parent_frame):
-            """Create daily elevation graphs for the last 14 days"""
-            # Clear existing graphs
-            for widget in parent_frame.winfo_children():
-                widget.destroy()
-            
-            # Create a container for both graphs
-            graphs_container = ttk.Frame(parent_frame)
-            graphs_container.pack(fill='both', expand=True)
-            
-            # Create top frame for cumulative graph
-            cumulative_frame = ttk.LabelFrame(graphs_container, text="Cumulative Elevation (Last 14 Days)", padding=10)
-            cumulative_frame.pack(fill='both', expand=True, padx=10, pady=5)
-            
-            # Create bottom frame for daily graph
-            daily_frame = ttk.LabelFrame(graphs_container, text="Daily Elevation (Last 14 Days)", padding=10)
-            daily_frame.pack(fill='both', expand=True, padx=10, pady=5)
-            
-            # Get the daily data
-            data = self.calculate_daily_data(days=14)
-            
-            if not data['dates']:  # If no data, return empty graphs
-                for frame in [cumulative_frame, daily_frame]:
-                    fig = Figure(figsize=(8, 2.5), dpi=100)
-                    canvas = FigureCanvasTkAgg(fig, master=frame)
-                    canvas.draw()
-                    canvas.get_tk_widget().pack(fill='both', expand=True)
-                return
-            
-            # Create cumulative graph
-            fig_cumulative = Figure(figsize=(8, 2.5), dpi=100)
-            ax_cumulative = fig_cumulative.add_subplot(111)
-            
-            # Calculate cumulative values
-            cumulative = np.cumsum(data['totals'])
-            
-            # Plot actual cumulative data
-            ax_cumulative.plot(range(len(data['dates'])), cumulative, 
-                            marker='o', color='#4CAF50', linewidth=2, markersize=6, label='Actual')
-            
-            # Calculate and plot goal trend line
-            challenge_stats = self.calculate_challenge_stats()
-            remaining_days = challenge_stats['days_remaining']
-            remaining_elevation = challenge_stats['remaining_elevation']
-            
-            if remaining_days > 0:
-                daily_goal = remaining_elevation / remaining_days
-                # For the 14-day window, calculate what the goal trend should be
-                start_elevation = cumulative[0] if len(cumulative) > 0 else 0
-                goal_line = start_elevation + np.arange(1, len(data['dates']) + 1) * daily_goal
-                
-                # Plot goal trend line
-                ax_cumulative.plot(range(len(data['dates'])), goal_line, '--', 
-                                color='#FF9800', linewidth=2, label='Goal Trend')
-                
-                # Add label for final goal value
-                if len(goal_line) > 0:
-                    final_goal = goal_line[-1]
-                    ax_cumulative.text(len(data['dates']) - 1, final_goal + (max(cumulative) * 0.02),
-                                    f'Goal: {int(final_goal):,}m', ha='center', va='bottom', color='#FF9800')
-            
-            # Add value labels for actual data
-            for i, value in enumerate(cumulative):
-                if i % 2 == 0:  # Add labels to every other point to avoid overcrowding
-                    label_y = value + (max(cumulative) * 0.02) if len(cumulative) > 0 else value
-                    ax_cumulative.text(i, label_y, f'{int(value):,}m', ha='center', va='bottom', fontsize=8)
-            
-            # Customize cumulative graph
-            ax_cumulative.set_xticks(range(len(data['dates'])))
-            ax_cumulative.set_xticklabels(data['dates'], rotation=45, ha='right', fontsize=8)
-            ax_cumulative.set_ylabel('Elevation Gain (m)')
-            ax_cumulative.grid(True, linestyle='--', alpha=0.7)
-            ax_cumulative.legend()
-            
-            # Add some padding to the top of the graph for labels
-            ax_cumulative.margins(y=0.1)
-            
-            # Adjust layout
-            fig_cumulative.tight_layout()
-            
-            # Create canvas and add to frame
-            canvas_cumulative = FigureCanvasTkAgg(fig_cumulative, master=cumulative_frame)
-            canvas_cumulative.draw()
-            canvas_cumulative.get_tk_widget().pack(fill='both', expand=True)
-            
-            # Create daily graph
-            fig_daily = Figure(figsize=(8, 2.5), dpi=100)
-            ax_daily = fig_daily.add_subplot(111)
-            
-            # Create bar chart for daily data
-            bars = ax_daily.bar(range(len(data['dates'])), data['totals'], color='#4CAF50', alpha=0.8)
-            
-            # Add horizontal line for average daily needed
-            if remaining_days > 0:
-                avg_line = ax_daily.axhline(y=daily_goal, color='#FF9800', linestyle='--', linewidth=2, 
-                                            label=f'Goal: {daily_goal:.0f}m/day')
-                ax_daily.legend()
-            
-            # Add value labels
-            for i, bar in enumerate(bars):
-                height = bar.get_height()
-                if height > 0:  # Only add labels to bars with values
-                    ax_daily.text(bar.get_x() + bar.get_width()/2., height + (max(data['totals']) * 0.02),
-                                f'{int(height):,}m', ha='center', va='bottom', fontsize=8)
-            
-            # Customize daily graph
-            ax_daily.set_xticks(range(len(data['dates'])))
-            ax_daily.set_xticklabels(data['dates'], rotation=45, ha='right', fontsize=8)
-            ax_daily.set_ylabel('Elevation Gain (m)')
-            ax_daily.grid(True, linestyle='--', alpha=0.7)
-            
-            # Add some padding to the top of the graph for labels
-            ax_daily.margins(y=0.1)
-            
-            # Adjust layout
-            fig_daily.tight_layout()
-            
-            # Create canvas and add to frame
-            canvas_daily = FigureCanvasTkAgg(fig_daily, master=daily_frame)
-            canvas_daily.draw()
-            canvas_daily.get_tk_widget().pack(fill='both', expand=True)
+    def clear_history_filter(self):
+        for key, var in self.filter_vars.items():
+            var.set("All" if key == 'activity' else "")
+        self.history_filter = {}
+        self.update_history()
+
+    def sort_history(self, column):
+        # Clicking the sorted column again flips the direction
+        sort_column, descending = self.history_sort
+        if column == sort_column:
+            descending = not descending
+        else:
+            descending = column == "Date"
+        self.history_sort = (column, descending)
+        self.update_history()
 
     def create_weekly_graph(self, parent_frame):
         # Create figure and axis
@@ -522,7 +2087,7 @@ class WorkoutTracker:
         self.graph_type = tk.StringVar(value="Daily Elevation")
         graph_combo = ttk.Combobox(controls_frame, 
                                 textvariable=self.graph_type,
-                                values=["Daily Elevation", "Daily Cumulative", "Weekly Elevation", "Weekly Cumulative", "Monthly Elevation", "Monthly Cumulative"],
+                                values=["Daily Elevation", "Daily Cumulative", "Weekly Elevation", "Weekly Cumulative", "Monthly Elevation", "Monthly Cumulative", "Calendar Heatmap", "Rolling Elevation", "Training Load", "Challenge Forecast"],
                                 state="readonly",
                                 width=20)
         graph_combo.pack(side='left', padx=5)
@@ -539,20 +2104,31 @@ class WorkoutTracker:
         for widget in self.graph_container.winfo_children():
             widget.destroy()
         
+        graph_type = self.graph_type.get()
+        
+        # The heatmap keeps its own figure and draws the whole challenge as one raster
+        if graph_type == "Calendar Heatmap":
+            self.calendar_heatmap.render(self.graph_container)
+            return
+        if graph_type == "Challenge Forecast":
+            self.create_forecast_graph()
+            return
+        
         # Create figure and axis
         fig = Figure(figsize=(8, 3), dpi=100)
         ax = fig.add_subplot(111)
         
-        graph_type = self.graph_type.get()
-        
-        if "Daily" in graph_type:
-            data = self.calculate_daily_data(days=14)  # Get data for the last 14 days
+        if graph_type in ("Rolling Elevation", "Training Load"):
+            data = self.training_metrics.recent(days=90)  # Last 90 days of derived metrics
+            x_labels = data['dates']
+        elif "Daily" in graph_type:
+            data = self.fast_daily_data(days=14)  # Get data for the last 14 days
             x_labels = data['dates']
         elif "Weekly" in graph_type:
-            data = self.calculate_weekly_data()
+            data = self.fast_weekly_data()
             x_labels = data['weeks']
         else:  # Monthly
-            data = self.calculate_monthly_data()
+            data = self.fast_monthly_data()
             x_labels = data['months']
         
         if not x_labels:  # If no data, return empty graph
@@ -561,10 +2137,21 @@ class WorkoutTracker:
             canvas.get_tk_widget().pack(fill='both', expand=True)
             return
         
-        if "Cumulative" in graph_type:
+        if graph_type == "Rolling Elevation":
+            ax.plot(range(len(x_labels)), data['elevation_7'], color='#4CAF50', linewidth=2, label='7-Day Total')
+            ax.plot(range(len(x_labels)), data['elevation_28'], color='#2196F3', linewidth=2, label='28-Day Total')
+            ax.legend()
+        
+        elif graph_type == "Training Load":
+            ax.plot(range(len(x_labels)), data['acute_load'], color='#FF9800', linewidth=2, label='Acute (7d)')
+            ax.plot(range(len(x_labels)), data['chronic_load'], color='#2196F3', linewidth=2, label='Chronic (42d)')
+            ax.legend()
+            ax.set_ylabel('Load (m/day)')
+        
+        elif "Cumulative" in graph_type:
             if "Daily" in graph_type:
                 # For daily cumulative, we want to show the total progress, not just within the window
-                challenge_stats = self.calculate_challenge_stats()
+                challenge_stats = self.fast_challenge_stats()
                 total_so_far = challenge_stats['challenge_elevation']
                 
                 # Calculate how much of that total came from the last 14 days
@@ -610,6 +2197,23 @@ class WorkoutTracker:
                                ha='center', va='bottom',
                                color='#FF9800')
                 
+                # Forecast fan for the next two weeks, continuing the daily axis past the last workout
+                forecast = self.calculate_forecast()
+                today = self.today()
+                latest = datetime.strptime(self.latest_date(), "%Y-%m-%d").date()
+                last = len(x_labels) - 1
+                if forecast and not forecast['final'] and today >= latest - timedelta(days=last):
+                    ahead = [i for i, d in enumerate(forecast['dates']) if d <= today + timedelta(days=14)]
+                    if ahead:
+                        positions = [last + (d - latest).days for d in [today] + [forecast['dates'][i] for i in ahead]]
+                        fan = {q: [total_so_far] + [forecast[q][i] for i in ahead] for q in ('p10', 'p50', 'p90')}
+                        x_labels = x_labels + [(latest + timedelta(days=k)).strftime('%b %d')
+                                               for k in range(1, positions[-1] - last + 1)]
+                        ax.fill_between(positions, fan['p10'], fan['p90'], color='#2196F3', alpha=0.2, label='Forecast P10-P90')
+                        ax.plot(positions, fan['p50'], '--', color='#2196F3', linewidth=2, label='Forecast Median')
+                        ax.text(positions[-1], fan['p90'][-1], f"{forecast['probability'] * 100:.0f}% chance of the goal",
+                                ha='right', va='bottom', color='#2196F3', fontsize=8)
+                
                 # Add value labels for actual data
                 for i, value in enumerate(daily_cumulative):
                     if i % 2 == 0:  # Add labels to every other point to avoid overcrowding
@@ -628,7 +2232,7 @@ class WorkoutTracker:
                               label='Actual')
                 
                 # Calculate and plot goal trend line
-                challenge_stats = self.calculate_challenge_stats()
+                challenge_stats = self.fast_challenge_stats()
                 remaining_elevation = challenge_stats['remaining_elevation']
                 
                 if "Weekly" in graph_type:
@@ -671,7 +2275,7 @@ class WorkoutTracker:
                 bars = ax.bar(range(len(x_labels)), data['totals'], color='#4CAF50', alpha=0.8)
                 
                 # Add horizontal line for daily goal if applicable
-                challenge_stats = self.calculate_challenge_stats()
+                challenge_stats = self.fast_challenge_stats()
                 if challenge_stats['days_remaining'] > 0:
                     daily_goal = challenge_stats['required_daily_avg']
                     ax.axhline(y=daily_goal, color='#FF9800', linestyle='--', linewidth=2, 
@@ -699,10 +2303,12 @@ class WorkoutTracker:
                     ax.text(i, label_y, f'{int(value):,}m',
                             ha='center', va='bottom')
         
-        # Customize graph
-        ax.set_xticks(range(len(x_labels)))
-        ax.set_xticklabels(x_labels, rotation=45, ha='right', fontsize=8 if "Daily" in graph_type else 9)
-        ax.set_ylabel('Elevation Gain (m)')
+        # Customize graph (long series only label every few points)
+        tick_step = max(1, len(x_labels) // 15)
+        ax.set_xticks(range(0, len(x_labels), tick_step))
+        ax.set_xticklabels(x_labels[::tick_step], rotation=45, ha='right', fontsize=8 if "Daily" in graph_type else 9)
+        if graph_type != "Training Load":
+            ax.set_ylabel('Elevation Gain (m)')
         ax.grid(True, linestyle='--', alpha=0.7)
         
         # Add some padding to the top of the graph for labels
@@ -716,53 +2322,48 @@ class WorkoutTracker:
         canvas.draw()
         canvas.get_tk_widget().pack(fill='both', expand=True)
 
-    def calculate_weekly_data(self):
-        if not self.workouts:
-            return {'weeks': [], 'totals': []}
-        
-        # Convert workout data to DataFrame
-        df = pd.DataFrame(self.workouts)
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # Set the date range
-        end_date = max(df['date'])
-        start_date = end_date - timedelta(weeks=11)  # Show last 12 weeks
-        
-        # Create weekly bins
-        df = df[df['date'] >= start_date]
-        weekly_totals = df.resample('W-MON', on='date')['elevation'].sum()
-        
-        # Format week labels
-        week_labels = [d.strftime('%b %d') for d in weekly_totals.index]
-        
-        return {
-            'weeks': week_labels,
-            'totals': weekly_totals.values
-        }
-
-
-    def calculate_monthly_data(self):
-        if not self.workouts:
-            return {'months': [], 'totals': []}
-        
-        df = pd.DataFrame(self.workouts)
-        df['date'] = pd.to_datetime(df['date'])
+    def create_forecast_graph(self):
+        fig = Figure(figsize=(8, 3), dpi=100)
+        ax = fig.add_subplot(111)
         
-        # Set the date range
-        end_date = max(df['date'])
-        start_date = end_date - pd.DateOffset(months=11)  # Show last 12 months
+        # Actual cumulative challenge elevation, read from the calendar grid
+        heatmap = self.calendar_heatmap
+        today = min(self.today(), self.challenge_end)
+        first = (self.challenge_start - heatmap.origin).days
+        last = (today - heatmap.origin).days
+        if last >= first:
+            cumulative = np.cumsum(heatmap.grid.reshape(-1)[first:last + 1])
+            actual_dates = [self.challenge_start + timedelta(days=i) for i in range(len(cumulative))]
+            ax.plot(actual_dates, cumulative, color='#4CAF50', linewidth=2, label='Actual')
+        
+        # Forecast fan from today to the end of the challenge
+        forecast = self.calculate_forecast()
+        if forecast and not forecast['final']:
+            current = self.fast_challenge_stats()['challenge_elevation']
+            fan_dates = [today] + forecast['dates']
+            fan = {q: np.concatenate(([current], forecast[q])) for q in ('p10', 'p50', 'p90')}
+            ax.fill_between(fan_dates, fan['p10'], fan['p90'], color='#2196F3', alpha=0.2, label='P10-P90')
+            ax.plot(fan_dates, fan['p50'], '--', color='#2196F3', linewidth=2, label='Median')
+            ax.text(fan_dates[-1], fan['p50'][-1], f"{forecast['probability'] * 100:.0f}% chance",
+                    ha='right', va='bottom', color='#2196F3')
+        
+        ax.axhline(y=self.elevation_goal, color='#FF9800', linestyle='--', linewidth=2,
+                   label=f'Goal: {self.elevation_goal:,}m')
         
-        # Create monthly bins using 'ME' (Month End) instead of deprecated 'M'
-        df = df[df['date'] >= start_date]
-        monthly_totals = df.resample('ME', on='date')['elevation'].sum()
+        # Customize graph
+        ax.set_xlim(self.challenge_start, self.challenge_end)
+        ax.xaxis.set_major_locator(mdates.MonthLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%b'))
+        ax.tick_params(axis='x', labelsize=8)
+        ax.set_ylabel('Elevation Gain (m)')
+        ax.grid(True, linestyle='--', alpha=0.7)
+        ax.legend(loc='upper left', fontsize=8)
         
-        # Format month labels
-        month_labels = [d.strftime('%b %Y') for d in monthly_totals.index]
+        fig.tight_layout()
         
-        return {
-            'months': month_labels,
-            'totals': monthly_totals.values
-        }
+        canvas = FigureCanvasTkAgg(fig, master=self.graph_container)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill='both', expand=True)
 
     def update_graph(self):
         self.create_graph(self.stats_frame)
@@ -777,24 +2378,14 @@ class WorkoutTracker:
     def save_workout(self):
         try:
             # Validate inputs
-            date = datetime.strptime(self.date_var.get(), "%Y-%m-%d").strftime("%Y-%m-%d")
-            distance = float(self.distance_var.get())
-            elevation = float(self.elevation_var.get())
-            activity = self.activity_var.get()
-            
-            if not activity or activity not in self.activities:
-                raise ValueError("Please select a valid activity")
+            workout = self.make_workout(self.date_var.get(), self.activity_var.get(),
+                                        self.distance_var.get(), self.elevation_var.get())
             
-            # Create workout entry
-            workout = {
-                "date": date,
-                "activity": activity,
-                "distance": distance,
-                "elevation": elevation
-            }
+            # Pick up workouts added elsewhere (e.g. through the API) before saving over the file
+            self.refresh()
             
             # Add to workouts list
-            self.workouts.append(workout)
+            self.add_workout(workout)
             self.save_data()
             self.update_history()
             self.update_stats()
@@ -813,6 +2404,9 @@ class WorkoutTracker:
         if not selected_item:
             messagebox.showwarning("Warning", "Please select a workout to delete")
             return
+        if selected_item[0].startswith("archived-"):
+            messagebox.showwarning("Warning", "Archived workouts (older than a year) are read-only")
+            return
         
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this workout?"):
             item = self.history_tree.item(selected_item[0])
@@ -820,22 +2414,150 @@ class WorkoutTracker:
             activity = item['values'][1]
             
             # Find and remove the workout
-            self.workouts = [w for w in self.workouts if not (w['date'] == date and w['activity'] == activity)]
+            self.refresh()
+            self.delete_workouts(date, activity)
+            self.save_data()
+            self.update_history()
+            self.update_stats()
+
+    def selected_position(self):
+        """List position of the selected current workout, or None (with a warning) if there isn't one"""
+        selected_item = self.history_tree.selection()
+        if not selected_item:
+            messagebox.showwarning("Warning", "Please select a workout")
+            return None
+        if selected_item[0].startswith("archived-"):
+            messagebox.showwarning("Warning", "Archived workouts (older than a year) are read-only")
+            return None
+        return int(selected_item[0])
+
+    def edit_selected_workout(self):
+        position = self.selected_position()
+        if position is None:
+            return
+        workout = self.workouts[position]
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Edit Workout")
+        dialog.transient(self.root)
+        edit_frame = ttk.Frame(dialog, padding=20)
+        edit_frame.pack(expand=True)
+        
+        fields = [
+            ("Activity:", tk.StringVar(value=workout['activity'])),
+            ("Date:", tk.StringVar(value=workout['date'])),
+            ("Distance (km):", tk.StringVar(value=f"{workout['distance']:g}")),
+            ("Elevation Gain (m):", tk.StringVar(value=f"{workout['elevation']:g}"))
+        ]
+        for row, (label, var) in enumerate(fields):
+            ttk.Label(edit_frame, text=label, style="Header.TLabel").grid(row=row, column=0, padx=5, pady=5, sticky='e')
+            if row == 0:
+                ttk.Combobox(edit_frame, textvariable=var, values=self.activities, width=30).grid(row=row, column=1, padx=5, pady=5)
+            else:
+                ttk.Entry(edit_frame, textvariable=var, width=32).grid(row=row, column=1, padx=5, pady=5)
+        
+        def save_edit():
+            try:
+                activity, workout_date, distance, elevation = (var.get() for _, var in fields)
+                updated = self.make_workout(workout_date, activity, distance, elevation)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e), parent=dialog)
+                return
+            
+            # Undo, delete, merge or another process may have moved the workout since the dialog opened
+            self.refresh()
+            current = self.find_workout(workout)
+            if current is None:
+                messagebox.showerror("Error", "This workout was changed or deleted elsewhere", parent=dialog)
+                dialog.destroy()
+                self.update_history()
+                return
+            self.edit_workout(current, updated)
             self.save_data()
             self.update_history()
             self.update_stats()
+            dialog.destroy()
+        
+        ttk.Button(edit_frame, text="Save Changes", command=save_edit, padding=10).grid(row=len(fields), column=0, columnspan=2, pady=20)
+
+    def undo_change(self):
+        # Changes made by another process since we last read the file end the undo history
+        if self.refresh():
+            self.update_history()
+            self.update_stats()
+            messagebox.showinfo("Undo", "The workout history was changed by another program and has been "
+                                "reloaded, so the undo history was reset.")
+            return
+        label = self.undo()
+        if label is None:
+            return
+        self.save_data()
+        self.update_history()
+        self.update_stats()
+
+    def redo_change(self):
+        # Changes made by another process since we last read the file end the undo history
+        if self.refresh():
+            self.update_history()
+            self.update_stats()
+            messagebox.showinfo("Redo", "The workout history was changed by another program and has been "
+                                "reloaded, so the undo history was reset.")
+            return
+        label = self.redo()
+        if label is None:
+            return
+        self.save_data()
+        self.update_history()
+        self.update_stats()
+
+    def update_undo_buttons(self):
+        self.undo_button.configure(text=f"Undo {self.undo_stack[-1]['label']}" if self.undo_stack else "Undo",
+                                   state='normal' if self.undo_stack else 'disabled')
+        self.redo_button.configure(text=f"Redo {self.redo_stack[-1]['label']}" if self.redo_stack else "Redo",
+                                   state='normal' if self.redo_stack else 'disabled')
+
+    def merge_workouts(self):
+        filename = filedialog.askopenfilename(title="Merge workout history",
+                                              filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+        if not filename:
+            return
+        
+        try:
+            result = self.merge_history(filename)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", f"Could not merge {os.path.basename(filename)}: {e}")
+            return
+        
+        self.update_history()
+        self.update_stats()
+        messagebox.showinfo("Merge Complete",
+                            f"Added {len(result['added'])} workouts, removed {len(result['removed'])}, "
+                            f"skipped {result['duplicates']} duplicates.")
 
     def update_history(self):
+        self.update_undo_buttons()
+        
         # Clear existing items
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
+        self.history_tree.delete(*self.history_tree.get_children())
         
-        # Sort workouts by date (newest first)
-        sorted_workouts = sorted(self.workouts, key=lambda x: x['date'], reverse=True)
+        # Show the sort direction on the active column heading
+        sort_column, descending = self.history_sort
+        for col in HistoryIndex.COLUMNS:
+            arrow = (" \u25bc" if descending else " \u25b2") if col == sort_column else ""
+            self.history_tree.heading(col, text=col + arrow)
+        
+        # Filtered positions in display order, straight from the maintained indexes
+        if self.show_archive.get():
+            index, workouts, first_current = self.full_history_index()
+        else:
+            index, workouts, first_current = self.history_index, self.workouts, 0
+        positions = index.query(sort_column, descending, **self.history_filter)
         
         # Add workouts to treeview
-        for workout in sorted_workouts:
-            self.history_tree.insert("", "end", values=(
+        for position in positions:
+            workout = workouts[position]
+            iid = str(position - first_current) if position >= first_current else f"archived-{position}"
+            self.history_tree.insert("", "end", iid=iid, values=(
                 workout['date'],
                 workout['activity'],
                 f"{workout['distance']:.1f} km",
@@ -843,27 +2565,39 @@ class WorkoutTracker:
             ))
 
     def load_data(self):
-        if os.path.exists(self.filename):
-            try:
-                with open(self.filename, 'r') as f:
-                    self.workouts = json.load(f)
-            except json.JSONDecodeError:
-                self.workouts = []
-                messagebox.showwarning("Warning", "Could not load workout history. Starting fresh.")
-        else:
-            self.workouts = []
+        try:
+            super().load_data()
+        except json.JSONDecodeError:
+            messagebox.showwarning("Warning", "Could not load workout history. Starting fresh.")
 
     def save_data(self):
         try:
-            with open(self.filename, 'w') as f:
-                json.dump(self.workouts, f, indent=2)
+            super().save_data()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save workout data: {str(e)}")
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = WorkoutTracker(root)
-    root.mainloop()
+    parser = argparse.ArgumentParser(description="Workout Tracker")
+    parser.add_argument("--serve", action="store_true", help="run the local JSON API instead of the GUI")
+    parser.add_argument("--host", default="127.0.0.1", help="address for --serve (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765, help="port for --serve")
+    parser.add_argument("--merge", metavar="FILE", help="merge another history file into ours and exit")
+    parser.add_argument("--distance-tolerance", type=float, default=0.0,
+                        help="km within which --merge treats distances as equal")
+    parser.add_argument("--elevation-tolerance", type=float, default=0.0,
+                        help="m within which --merge treats elevations as equal")
+    args = parser.parse_args()
+    
+    if args.merge:
+        result = WorkoutData().merge_history(args.merge, args.distance_tolerance, args.elevation_tolerance)
+        print(f"Added {len(result['added'])} workouts, removed {len(result['removed'])}, "
+              f"skipped {result['duplicates']} duplicates.")
+    elif args.serve:
+        StatsServer(WorkoutData(), args.host, args.port).run()
+    else:
+        root = tk.Tk()
+        app = WorkoutTracker(root)
+        root.mainloop()
 
 
 
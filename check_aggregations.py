@@ -0,0 +1,415 @@
+"""Differential check of the optimized paths in Active.py against straightforward references.
+
+Generates random workout histories (plus hand-picked edge cases), loads each through
+WorkoutData exactly as the app does, and compares every fast_* method with the
+calculate_* method it replaces. It then replays random add/import/delete/edit/undo/redo
+sequences against a plain list model, comparing the incrementally maintained history
+index, calendar heatmap and training metrics with fresh rebuilds after every step,
+and merges random pairs of histories against a multiset reference.
+Every WorkoutData runs with "today" pinned to TODAY, so the archive cutoff and the
+random dates do not move with the clock and a printed seed replays on any day.
+Exits non-zero on the first mismatch and prints the failing seed so it can be replayed
+with --seed.
+
+    python check_aggregations.py --runs 200 --seed 1 --size 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import numpy as np
+
+from Active import CalendarHeatmap, HistoryIndex, TrainingMetrics, WorkoutData, content_key
+
+# Fixed "today": the archive cutoff is then the challenge start (2025-02-01)
+TODAY = date(2026, 1, 15)
+
+# Dates that tend to break binning: week boundaries, month ends, leap days,
+# the archive cut-over and the challenge edges
+EDGE_DATES = [
+    date(2024, 2, 29), date(2024, 12, 31), date(2025, 1, 31),  # archived
+    date(2025, 2, 1), date(2025, 2, 2), date(2025, 2, 3),  # challenge start (Sat, Sun, Mon)
+    date(2025, 3, 31), date(2025, 6, 30), date(2025, 12, 31),
+    date(2026, 1, 31), date(2026, 2, 1), date(2026, 2, 2),  # challenge end
+    date(2026, 2, 28), date(2026, 3, 1), date(2028, 2, 29),  # after the challenge
+]
+TODAYS = [date(2024, 6, 1), date(2025, 2, 1), date(2025, 8, 15), date(2026, 2, 1), date(2027, 1, 1)]
+
+
+def random_history(rng, size):
+    names = ["Bike", "Run", "Hike", "Ski Tour", "Swim"]  # Swim is not a tracked activity
+    span_start = rng.choice([date(2023, 6, 1), date(2025, 2, 1), date(2025, 9, 1)])
+    span_days = rng.choice([1, 7, 40, 400, 900])
+    workouts = []
+    for _ in range(rng.randint(0, size)):
+        if rng.random() < 0.15:
+            day = rng.choice(EDGE_DATES)
+        else:
+            day = span_start + timedelta(days=rng.randrange(span_days))
+        workouts.append({
+            'date': day.isoformat(),
+            'activity': rng.choice(names),
+            'distance': 0.0 if rng.random() < 0.1 else round(rng.uniform(0.1, 40), 2),
+            'elevation': 0.0 if rng.random() < 0.1 else float(rng.randint(1, 2500)),
+        })
+    # Same-day duplicates
+    for w in rng.sample(workouts, min(len(workouts), rng.randint(0, 5))):
+        workouts.append(dict(w))
+    rng.shuffle(workouts)
+    return workouts
+
+
+def fixed_histories():
+    """(history, whether the fast paths may fall back to the reference ones) pairs"""
+    def workout(day, elevation=100.0, activity="Hike"):
+        return {'date': day.isoformat(), 'activity': activity, 'distance': 1.0, 'elevation': elevation}
+    return [
+        ([], False),
+        ([workout(date(2025, 5, 5))], False),
+        ([workout(date(2025, 5, 5), 0.0)], False),
+        ([workout(date(2024, 2, 29))], True),  # archive only
+        ([workout(d) for d in (date(2025, 3, 2), date(2025, 3, 3), date(2025, 3, 4))], False),  # Sun, Mon, Tue
+        ([workout(date(2025, 2, 1)), workout(date(2025, 2, 1)), workout(date(2026, 2, 1), 5.0)], False),
+        ([workout(date(2028, 2, 29)), workout(date(2028, 1, 31)), workout(date(2027, 3, 31))], False),
+        # Archived year plus hot workouts on both sides of the cutoff, windows ending well after it
+        ([workout(date(2024, 12, 31)), workout(date(2025, 2, 1)), workout(date(2026, 1, 31))], False),
+    ]
+
+
+def same(expected, actual):
+    if isinstance(expected, dict):
+        return expected.keys() == actual.keys() and all(same(expected[k], actual[k]) for k in expected)
+    if isinstance(expected, (list, tuple, np.ndarray)) and not isinstance(expected, str):
+        if len(expected) != len(actual):
+            return False
+        if len(expected) and isinstance(expected[0], (str, dict)):
+            return all(same(e, a) for e, a in zip(expected, actual))
+        return bool(np.allclose(np.asarray(expected, dtype=float), np.asarray(actual, dtype=float)))
+    if isinstance(expected, str):
+        return expected == actual
+    return bool(np.isclose(expected, actual))
+
+
+def comparisons(data):
+    """(name, oracle, fast) callables for one loaded history"""
+    checks = [
+        ("activity_breakdown", data.calculate_activity_breakdown, data.fast_activity_breakdown),
+        ("weekly_data", data.calculate_weekly_data, data.fast_weekly_data),
+        ("monthly_data", data.calculate_monthly_data, data.fast_monthly_data),
+    ]
+    for days in (1, 14, 30):
+        checks.append((f"daily_data({days})", lambda d=days: data.calculate_daily_data(d),
+                       lambda d=days: data.fast_daily_data(d)))
+    for today in TODAYS:
+        checks.append((f"challenge_stats({today})", lambda t=today: data.calculate_challenge_stats(t),
+                       lambda t=today: data.fast_challenge_stats(t)))
+    return checks
+
+
+def compare_aggregations(data, timings):
+    """Run every fast/reference pair on the current state; returns a failure or None"""
+    for name, oracle, fast in comparisons(data):
+        started = time.perf_counter()
+        expected = oracle()
+        middle = time.perf_counter()
+        actual = fast()
+        finished = time.perf_counter()
+
+        totals = timings.setdefault(name.split('(')[0], [0.0, 0.0])
+        totals[0] += middle - started
+        totals[1] += finished - middle
+        if not same(expected, actual):
+            return name, expected, actual
+    return None
+
+
+def check(history, directory, timings, may_fall_back=True):
+    filename = os.path.join(directory, "workout_history.json")
+    with open(filename, 'w') as f:
+        json.dump(history, f)
+    data = WorkoutData(filename, today=TODAY)
+    
+    # Record every window that sent a fast_* method to its reference
+    fell_back = []
+    reaches_archive = data._reaches_archive
+    def recording(since):
+        reached = reaches_archive(since)
+        if reached:
+            fell_back.append(since)
+        return reached
+    data._reaches_archive = recording
+    
+    failure = compare_aggregations(data, timings)
+    if failure is None and fell_back and not may_fall_back:
+        return "fast path", "no fallback", f"fell back to the reference for windows from {fell_back}"
+    return failure
+
+
+def check_structures(data):
+    """Compare every incrementally maintained structure with one rebuilt from data.workouts"""
+    index, rebuilt = data.history_index, HistoryIndex(data.workouts)
+    for name in ("dates", "distance", "elevation"):
+        if not np.array_equal(getattr(index, name), getattr(rebuilt, name)):
+            return f"history index {name}", getattr(rebuilt, name), getattr(index, name)
+    for col in HistoryIndex.COLUMNS:
+        if not np.array_equal(index.order(col), rebuilt.order(col)):
+            return f"history index {col} order", rebuilt.order(col), index.order(col)
+    if {a: p.tolist() for a, p in index.positions.items()} != {a: p.tolist() for a, p in rebuilt.positions.items()}:
+        return "history index positions", rebuilt.positions, index.positions
+    filters = {'start_date': "2025-09-01", 'max_distance': 2.0, 'activity': "Hike", 'min_elevation': 100.0}
+    for col in HistoryIndex.COLUMNS:
+        for descending in (False, True):
+            if not np.array_equal(index.query(col, descending, **filters), rebuilt.query(col, descending, **filters)):
+                return f"history query by {col}", rebuilt.query(col, descending, **filters), index.query(col, descending, **filters)
+
+    heatmap = CalendarHeatmap(data.challenge_start, data.challenge_end, data.archived_days + data.workouts)
+    if not np.allclose(data.calendar_heatmap.grid, heatmap.grid):
+        return "calendar heatmap", heatmap.grid, data.calendar_heatmap.grid
+
+    # The maintained series may start earlier (removing the first workout keeps the
+    # start) and run longer; days outside the rebuilt series must be empty
+    metrics, fresh = data.training_metrics, TrainingMetrics(data.archived_days + data.workouts, data.today())
+    series = ("elevation", "distance", "acute", "chronic")
+    if fresh.start is None:
+        if metrics.start is not None and any(np.abs(getattr(metrics, name)).max(initial=0) > 1e-6 for name in series):
+            return "training metrics without workouts", 0.0, metrics.elevation
+        return None
+    offset = int((fresh.start - metrics.start).astype(int))
+    length = min(len(fresh.elevation), len(metrics.elevation) - offset)
+    pairs = [(name, getattr(metrics, name), getattr(fresh, name)) for name in series]
+    for window in TrainingMetrics.WINDOWS:
+        pairs.append((f"elevation_{window}", metrics.rolling_elevation[window], fresh.rolling_elevation[window]))
+        pairs.append((f"distance_{window}", metrics.rolling_distance[window], fresh.rolling_distance[window]))
+    for name, maintained, expected in pairs:
+        if not np.allclose(maintained[offset:offset + length], expected[:length], atol=1e-6):
+            return f"training metrics {name}", expected[:length], maintained[offset:offset + length]
+        if name in ("elevation", "distance") and np.abs(maintained[:offset]).max(initial=0) > 1e-6:
+            return f"training metrics {name} before the series start", 0.0, maintained[:offset]
+    return None
+
+
+def check_edits(rng, directory, timings, steps=60):
+    """Random add/import/delete/edit/undo/redo sequence against a list model; returns a failure or None
+
+    After every step the workout and tombstone lists are compared with the model and
+    every maintained structure with a rebuild; the aggregations are compared every
+    few steps and at the end.
+    """
+    filename = os.path.join(directory, "workout_history.json")
+    with open(filename, 'w') as f:
+        json.dump(random_history(rng, 40), f)
+    data = WorkoutData(filename, today=TODAY)
+    
+    # The model keeps (workouts, tombstone keys) snapshots for undo and redo
+    workouts = list(data.workouts)
+    tombstones = [content_key(t) for t in data.tombstones]
+    undo, redo = [], []
+    
+    for step in range(steps):
+        action = rng.choice(["add", "add", "import", "delete", "edit", "undo", "undo", "redo"])
+        before = (list(workouts), list(tombstones))
+        if action == "add":
+            # Re-adding a deleted workout now and then
+            workout = dict(rng.choice(data.tombstones)) if data.tombstones and rng.random() < 0.3 else random_workout(rng, data)
+            workout.pop('deleted', None)
+            data.add_workout(workout)
+            tombstones = [t for t in tombstones if t != content_key(workout)]
+            workouts.append(workout)
+        elif action == "import":
+            # Big enough to take the bulk (rebuild) path in the training metrics
+            imported = [random_workout(rng, data) for _ in range(rng.choice([2, 60]))]
+            data.add_workouts(imported)
+            keys = {content_key(w) for w in imported}
+            tombstones = [t for t in tombstones if t not in keys]
+            workouts.extend(imported)
+        elif action == "delete" and workouts:
+            target = rng.choice(workouts)
+            data.delete_workouts(target['date'], target['activity'])
+            gone = [w for w in workouts if w['date'] == target['date'] and w['activity'] == target['activity']]
+            workouts = [w for w in workouts if not (w['date'] == target['date'] and w['activity'] == target['activity'])]
+            tombstones = tombstones + [content_key(w) for w in gone]
+        elif action == "edit" and workouts:
+            position = rng.randrange(len(workouts))
+            workout = dict(workouts[position], elevation=float(rng.randint(0, 3) * 100))
+            data.edit_workout(position, workout)
+            old = content_key(workouts[position])
+            tombstones = [t for t in tombstones if t != content_key(workout)]
+            if old != content_key(workout):
+                tombstones.append(old)
+            workouts[position] = workout
+        elif action == "undo" and undo:
+            data.undo()
+            redo.append(before)
+            workouts, tombstones = undo.pop()
+        elif action == "redo" and redo:
+            data.redo()
+            undo.append(before)
+            workouts, tombstones = redo.pop()
+        else:
+            continue
+        if action in ("add", "import", "delete", "edit"):
+            undo.append(before)
+            del undo[:-data.UNDO_LIMIT]
+            redo = []
+        
+        if data.workouts != workouts:
+            return f"workouts after step {step} ({action})", workouts, data.workouts
+        if sorted(content_key(t) for t in data.tombstones) != sorted(tombstones):
+            return f"tombstones after step {step} ({action})", sorted(tombstones), sorted(content_key(t) for t in data.tombstones)
+        failure = check_structures(data)
+        if failure is None and step % 15 == 14:
+            failure = compare_aggregations(data, timings)
+        if failure:
+            name, expected, actual = failure
+            return f"{name} after step {step} ({action})", expected, actual
+    return compare_aggregations(data, timings)
+
+
+def random_workout(rng, data):
+    # Mostly recent (kept in the hot file); sometimes years back, before the
+    # training metrics series start, to force their rebuild path
+    day = data.today() - timedelta(days=rng.randrange(2500 if rng.random() < 0.1 else 30))
+    return {'date': day.isoformat(), 'activity': rng.choice(data.activities),
+            'distance': float(rng.randint(0, 3)), 'elevation': float(rng.randint(0, 3) * 100)}
+
+
+def merge_reference(ours, theirs):
+    """Expected merge of two histories as content-key multisets (exact matching only)"""
+    def count(records, deleted):
+        return Counter(content_key(w) for w in records if bool(w.get('deleted')) == deleted)
+    our_workouts, our_tombstones = count(ours, False), count(ours, True)
+    their_workouts, their_tombstones = count(theirs, False), count(theirs, True)
+    new_tombstones = their_tombstones - our_tombstones
+    kept = our_workouts - new_tombstones
+    remaining = their_workouts - (our_tombstones + new_tombstones)
+    added = remaining - kept
+    return {
+        'workouts': kept + added,
+        'tombstones': our_tombstones + new_tombstones,
+        'added': added,
+        'removed': our_workouts & new_tombstones,
+        'duplicates': sum((remaining & kept).values())
+    }
+
+
+def check_merge(rng, directory):
+    """Merge two random histories through WorkoutData and compare with the multiset reference"""
+    def side(n):
+        # Few distinct values, so duplicates and tombstone matches are common; some
+        # tombstones are old enough to be archived
+        records = []
+        for _ in range(n):
+            deleted = rng.random() < 0.2
+            day = TODAY - timedelta(days=rng.randrange(400, 402) if deleted and rng.random() < 0.4 else rng.randrange(4))
+            workout = {'date': day.isoformat(), 'activity': rng.choice(["Hike", "Run"]),
+                       'distance': float(rng.randint(1, 2)), 'elevation': 100.0}
+            if deleted:
+                workout['deleted'] = True
+            records.append(workout)
+        return records
+    ours, theirs = side(rng.randint(0, 12)), side(rng.randint(0, 12))
+    ours_file, theirs_file = os.path.join(directory, "ours.json"), os.path.join(directory, "theirs.json")
+    for filename, records in ((ours_file, ours), (theirs_file, theirs)):
+        with open(filename, 'w') as f:
+            json.dump(records, f)
+    
+    data = WorkoutData(ours_file, today=TODAY)
+    cutoff = data.archive_cutoff().isoformat()
+    if any(t['date'] < cutoff for t in data.tombstones):
+        return "tombstones left in the hot file", cutoff, data.tombstones
+    before = (list(data.workouts), Counter(content_key(t) for t in data.tombstones))
+    result = data.merge_history(theirs_file)
+    expected = merge_reference(ours, theirs)
+    actual = {
+        'workouts': Counter(content_key(w) for w in data.workouts),
+        'tombstones': Counter(content_key(t) for t in data.store.load_tombstones() + data.tombstones),
+        'added': Counter(content_key(w) for w in result['added']),
+        'removed': Counter(content_key(w) for w in result['removed']),
+        'duplicates': result['duplicates']
+    }
+    if actual != expected:
+        return "merge", expected, actual
+    if any(t['date'] < cutoff for t in data.tombstones):
+        return "merged tombstones left in the hot file", cutoff, data.tombstones
+    after = (list(data.workouts), Counter(content_key(t) for t in data.tombstones))
+    
+    data.undo()
+    if (data.workouts, Counter(content_key(t) for t in data.tombstones)) != before:
+        return "merge undo", before, (data.workouts, data.tombstones)
+    data.redo()
+    if (data.workouts, Counter(content_key(t) for t in data.tombstones)) != after:
+        return "merge redo", after, (data.workouts, data.tombstones)
+    
+    # Merging an empty history changes nothing, at any tolerance
+    with open(theirs_file, 'w') as f:
+        json.dump([], f)
+    result = data.merge_history(theirs_file, distance_tolerance=1.5, elevation_tolerance=50.0)
+    if data.workouts != after[0] or result['removed'] or result['added']:
+        return "merge with an empty history", after[0], data.workouts
+    
+    # Archiving is idempotent: loading again leaves the archived tombstones as they are
+    archived = Counter(content_key(t) for t in data.store.load_tombstones())
+    reloaded = WorkoutData(ours_file, today=TODAY)
+    if Counter(content_key(t) for t in reloaded.store.load_tombstones()) != archived:
+        return "archived tombstones after reloading", archived, reloaded.store.load_tombstones()
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the optimized paths with the reference ones")
+    parser.add_argument("--runs", type=int, default=100, help="random histories to check")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first history")
+    parser.add_argument("--size", type=int, default=300, help="maximum workouts per random history")
+    args = parser.parse_args()
+
+    timings = {}
+    cases = [("fixed", i, history, may_fall_back) for i, (history, may_fall_back) in enumerate(fixed_histories())]
+    cases += [("seed", seed, random_history(random.Random(seed), args.size), True)
+              for seed in range(args.seed, args.seed + args.runs)]
+
+    for kind, number, history, may_fall_back in cases:
+        # Fresh directory per history so archive segments never leak between cases
+        with tempfile.TemporaryDirectory() as directory:
+            failure = check(history, directory, timings, may_fall_back)
+        if failure:
+            name, expected, actual = failure
+            print(f"MISMATCH in {name} for {kind} history {number} ({len(history)} workouts)")
+            print(f"  expected: {expected}")
+            print(f"  actual:   {actual}")
+            return 1
+
+    for seed in range(args.seed, args.seed + args.runs):
+        with tempfile.TemporaryDirectory() as directory:
+            failure = check_edits(random.Random(seed), directory, timings)
+        if failure:
+            name, expected, actual = failure
+            print(f"MISMATCH in {name} for edit sequence {seed}")
+            print(f"  expected: {expected}")
+            print(f"  actual:   {actual}")
+            return 1
+
+    for seed in range(args.seed, args.seed + args.runs):
+        with tempfile.TemporaryDirectory() as directory:
+            failure = check_merge(random.Random(seed), directory)
+        if failure:
+            name, expected, actual = failure
+            print(f"MISMATCH in {name} for merge {seed}")
+            print(f"  expected: {expected}")
+            print(f"  actual:   {actual}")
+            return 1
+
+    print(f"{len(cases)} histories, {args.runs} edit sequences and {args.runs} merges agree")
+    for name, (oracle, fast) in sorted(timings.items()):
+        print(f"  {name:<20} reference {oracle * 1000:8.1f} ms   fast {fast * 1000:8.1f} ms   "
+              f"speedup {oracle / max(fast, 1e-9):6.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())